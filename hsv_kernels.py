@@ -0,0 +1,67 @@
+"""
+HSV掩码内核 - Image Privacy Guardian
+参数变化时为H、S、V三个通道各生成一张256项的查找表（命中为255，否则为0），
+逐像素只需三次查表和按位与，无分支，色调回绕也直接编码在查找表中
+内核在预览后台线程和清理线程中调用，因此不启用parallel：Numba的TBB线程层
+在非主线程首次启动并行区域后，会导致进程退出时挂起
+Numba不可用时 NUMBA_AVAILABLE 为 False，调用方应回退到 cv2.inRange
+"""
+
+import numpy as np
+
+# 导入Numba支持（可选依赖）
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def build_hsv_luts(hue_lo, hue_hi, s_min, v_min, luts=None):
+    """
+    生成HSV阈值查找表
+
+    Args:
+        hue_lo: 色调下限 (0-179)
+        hue_hi: 色调上限 (0-179)，hue_lo > hue_hi 表示范围越过0/179回绕
+        s_min: 最小饱和度
+        v_min: 最小明度
+        luts: 可复用的 (3, 256) uint8 数组，为None时新建
+
+    Returns:
+        (3, 256) uint8 查找表，依次对应H、S、V通道
+    """
+    if luts is None:
+        luts = np.zeros((3, 256), np.uint8)
+    else:
+        luts.fill(0)
+
+    if hue_lo <= hue_hi:
+        luts[0, hue_lo:hue_hi + 1] = 255
+    else:
+        luts[0, hue_lo:180] = 255
+        luts[0, :hue_hi + 1] = 255
+    luts[1, s_min:] = 255
+    luts[2, v_min:] = 255
+    return luts
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def hsv_mask_lut(hsv, luts, out):
+        """
+        按查找表生成HSV颜色掩码（与对应范围的 cv2.inRange 等价）
+
+        Args:
+            hsv: HSV图像 (H, W, 3) uint8
+            luts: build_hsv_luts 生成的 (3, 256) uint8 查找表
+            out: 输出掩码 (H, W) uint8，命中为255，否则为0
+        """
+        lut_h = luts[0]
+        lut_s = luts[1]
+        lut_v = luts[2]
+        rows, cols = out.shape
+        for i in range(rows):
+            for j in range(cols):
+                out[i, j] = lut_h[hsv[i, j, 0]] & lut_s[hsv[i, j, 1]] & lut_v[hsv[i, j, 2]]
+        return out
@@ -6,39 +6,192 @@ Image Privacy Guardian - 主窗口
 import sys
 import os
 import json
+import collections
+import hashlib
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
-                             QWidget, QListWidget, QPushButton, QTextEdit, QLabel,
+                             QWidget, QListWidget, QPushButton, QPlainTextEdit, QLabel,
                              QFileDialog, QMessageBox, QGroupBox, QSplitter,
                              QListWidgetItem, QFrame, QInputDialog)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QIcon
 
 from advanced_settings_ui import AdvancedSettingsDialog
-from monitoring_manager import MonitoringManager
+from monitoring_manager import (MonitoringManager, ProcessingWorker, DirCache, DEFAULT_SKIP_DIRS, walk_images,
+                                record_key, shutdown_clean_pool)
+
+# 导入orjson支持（可选依赖，用于加速配置文件序列化）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 导入psutil支持（可选依赖，用于扫描时按CPU占用自适应限速）
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 默认备份文件夹，导入时解析一次，避免每次使用都调用getcwd
+DEFAULT_BACKUP_FOLDER = os.path.join(os.getcwd(), '_AEGIS_BACKUP')
+
+
+def dumps_config(config_data):
+    """将配置序列化为UTF-8编码的缩进JSON字节串"""
+    if ORJSON_AVAILABLE:
+        # OPT_NON_STR_KEYS与json模块一致，允许非字符串键
+        return orjson.dumps(config_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(config_data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def folder_key(folder_path):
+    """监控文件夹的比较键：解析符号链接和"."、".."，并统一大小写和分隔符"""
+    return os.path.normcase(os.path.realpath(folder_path))
+
+
+def dedupe_folders(folders):
+    """去除重复的监控文件夹和被其他文件夹包含的子文件夹，保留原有顺序和路径写法"""
+    keyed = [(folder_key(folder), folder) for folder in folders]
+    prefixes = {key: key if key.endswith(os.sep) else key + os.sep for key, _ in keyed}
+    
+    result = []
+    seen = set()
+    for key, folder in keyed:
+        if key in seen:
+            continue
+        if any(key.startswith(prefix) for other, prefix in prefixes.items() if other != key):
+            continue
+        seen.add(key)
+        result.append(folder)
+    return result
+
+
+# 主窗口样式表：状态切换按钮通过objectName和动态属性state选择样式，
+# 切换状态时只需重新polish，不再重新解析样式表
+MAIN_WINDOW_STYLE = """
+    QMainWindow {
+        background-color: #f8f9fa;
+        color: #1e3a8a;
+    }
+    QLabel#title {
+        font-size: 18px;
+        font-weight: bold;
+        color: #ffffff;
+        background-color: #1e3a8a;
+        padding: 15px;
+        border-radius: 8px;
+        margin: 5px;
+    }
+    
+    QPushButton#mainControl, QPushButton#manualScan, QPushButton#autoScan {
+        color: white;
+        border: none;
+        padding: 12px 16px;
+        border-radius: 8px;
+        font-size: 13px;
+        font-weight: bold;
+    }
+    
+    QPushButton#mainControl[state="idle"] { background-color: #3b82f6; }
+    QPushButton#mainControl[state="idle"]:hover { background-color: #2563eb; }
+    QPushButton#mainControl[state="idle"]:pressed { background-color: #1d4ed8; }
+    QPushButton#mainControl[state="active"], QPushButton#mainControl[state="stopped"] {
+        padding: 12px;
+        font-size: 14px;
+    }
+    QPushButton#mainControl[state="active"] { background-color: #6c757d; }
+    QPushButton#mainControl[state="active"]:hover { background-color: #5a6268; }
+    QPushButton#mainControl[state="active"]:pressed { background-color: #495057; }
+    QPushButton#mainControl[state="stopped"] { background-color: #2c3e50; }
+    QPushButton#mainControl[state="stopped"]:hover { background-color: #34495e; }
+    QPushButton#mainControl[state="stopped"]:pressed { background-color: #1a252f; }
+    
+    QPushButton#manualScan[state="idle"] { background-color: #059669; }
+    QPushButton#manualScan[state="idle"]:hover { background-color: #047857; }
+    QPushButton#manualScan[state="idle"]:pressed { background-color: #065f46; }
+    QPushButton#manualScan[state="active"] { background-color: #dc2626; }
+    QPushButton#manualScan[state="active"]:hover { background-color: #b91c1c; }
+    QPushButton#manualScan[state="active"]:pressed { background-color: #991b1b; }
+    
+    QPushButton#autoScan[state="active"], QPushButton#autoScan[state="stopped"] {
+        padding: 8px 12px;
+        border-radius: 6px;
+    }
+    QPushButton#autoScan[state="idle"], QPushButton#autoScan[state="stopped"] { background-color: #7c3aed; }
+    QPushButton#autoScan[state="idle"]:hover, QPushButton#autoScan[state="stopped"]:hover { background-color: #6d28d9; }
+    QPushButton#autoScan[state="idle"]:pressed, QPushButton#autoScan[state="stopped"]:pressed { background-color: #5b21b6; }
+    QPushButton#autoScan[state="active"] { background-color: #dc2626; }
+    QPushButton#autoScan[state="active"]:hover { background-color: #b91c1c; }
+    QPushButton#autoScan[state="active"]:pressed { background-color: #991b1b; }
+    
+    QPushButton#mainControl:disabled, QPushButton#manualScan:disabled, QPushButton#autoScan:disabled {
+        background-color: #e5e7eb;
+        color: #9ca3af;
+    }
+"""
 
 
 class ScanWorker(QThread):
     """异步扫描工作线程"""
-    progress_update = pyqtSignal(str)  # 进度更新信号
-    file_found = pyqtSignal(str)  # 发现文件信号
+    progress_batch = pyqtSignal(list)  # 进度消息批量更新信号
     scan_finished = pyqtSignal(int)  # 扫描完成信号，参数为处理的文件数量
     error_occurred = pyqtSignal(str)  # 错误信号
     
-    def __init__(self, monitored_folders, backup_folder):
+    def __init__(self, monitored_folders, backup_folder, cpu_limit=70, cache_path=None,
+                 skip_dirs=DEFAULT_SKIP_DIRS):
         super().__init__()
         self.monitored_folders = monitored_folders
         self.backup_folder = backup_folder
+        # 跳过的目录名，以"."开头的隐藏目录也会跳过；备份目录按路径比较
+        self.skip_dirs = frozenset(skip_dirs)
+        # 目录修改时间缓存文件，为None时不使用缓存
+        self.cache_path = cache_path
+        self.dir_cache = None  # DirCache，不使用缓存时为None
+        self._cache_fingerprint = None
+        self._worker_local = threading.local()
+        # CPU占用超过该百分比时才放慢扫描，0表示不限速
+        self.cpu_limit = cpu_limit
+        self._ewma_cpu = 0.0
+        self._pace_counter = 0
         self.processed_count = 0
+        self.processed_snapshot = {}
         self.should_stop = False
+        # 并行处理文件的线程数
+        self.max_workers = min(8, os.cpu_count() or 4)
+        # 同时排队的任务上限
+        self.max_pending = self.max_workers * 4
+        # 进度消息先缓存，按条数或时间间隔批量发送，减少跨线程信号数量
+        self._pending_msgs = []
+        self._msgs_lock = threading.Lock()
+        self._last_flush = time.monotonic()
         
     def run(self):
         """执行扫描任务"""
+        temp_manager = None
         try:
-            from monitoring_manager import MonitoringManager, ProcessingWorker
+            # 去除重复和嵌套的文件夹，避免同一目录树被扫描多次
+            self.monitored_folders = dedupe_folders(self.monitored_folders)
             
             # 创建临时的监控管理器
             temp_manager = MonitoringManager(backup_folder=self.backup_folder)
             
+            # 一次性载入已处理记录，扫描循环中直接查表
+            self.processed_snapshot = temp_manager.snapshot_processed_files()
+            
+            # 每个线程池线程在本次扫描中复用同一个处理工作器
+            self._worker_local = threading.local()
+            
+            # 载入上次扫描的目录缓存，本次只保留实际访问到的目录；
+            # 原地改写文件内容不会改变目录修改时间，这类变化由实时监控负责
+            if self.cache_path is not None:
+                self._cache_fingerprint = self.cache_fingerprint(temp_manager)
+                self.dir_cache = DirCache(self.load_dir_cache(), self.all_recorded)
+            
             self.processed_count = 0
             total_folders = len(self.monitored_folders)
             
@@ -47,93 +200,204 @@ class ScanWorker(QThread):
                     break
                     
                 if not os.path.exists(folder):
-                    self.progress_update.emit(f"⚠️ 文件夹不存在: {folder}")
+                    self.emit_progress(f"⚠️ 文件夹不存在: {folder}")
                     continue
                 
-                self.progress_update.emit(f"📂 扫描文件夹 ({i+1}/{total_folders}): {os.path.basename(folder)}")
+                self.emit_progress(f"📂 扫描文件夹 ({i+1}/{total_folders}): {os.path.basename(folder)}")
                 
                 # 扫描文件夹
                 folder_count = self.scan_folder_with_throttle(temp_manager, folder)
                 self.processed_count += folder_count
-                
-                # 短暂休息，避免过度占用资源
-                self.msleep(100)
             
+            if not self.should_stop:
+                self.save_dir_cache()
+            self.flush_progress()
             if not self.should_stop:
                 self.scan_finished.emit(self.processed_count)
             
         except Exception as e:
+            self.flush_progress()
             self.error_occurred.emit(str(e))
+        finally:
+            # 本线程没有事件循环，管理器的定时保存不会触发，结束时写入处理记录
+            if temp_manager is not None:
+                temp_manager.flush_processed_files()
     
     def scan_folder_with_throttle(self, manager, folder_path):
         """带资源控制的文件夹扫描"""
         count = 0
-        file_count = 0
         
         try:
-            # 首先统计文件数量
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if manager.is_image_file(os.path.join(root, file)):
-                        file_count += 1
+            # 热循环中用到的属性和函数绑定到局部变量
+            processed_snapshot = self.processed_snapshot
+            emit_progress = self.emit_progress
             
-            if file_count == 0:
-                return 0
-            
-            # 处理文件
+            # 处理文件：没有记录的文件直接交给线程池清理；有记录的文件在修改时间或大小变化时
+            # 需要读取全文计算哈希，也放到线程池中校验，让多个文件的读取同时进行而不是在本线程中逐个阻塞
             processed = 0
-            for root, dirs, files in os.walk(folder_path):
-                if self.should_stop:
-                    break
-                    
-                for file in files:
+            pending = set()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # 边遍历边处理，不再为统计总数预先走完整个目录树
+                for entry in walk_images(folder_path, manager.is_image_name, self.skip_dirs,
+                                         self.backup_folder, self.dir_cache):
                     if self.should_stop:
                         break
-                        
-                    file_path = os.path.join(root, file)
+                    file_path = entry.path
+                    file_name = entry.name
+                    
+                    processed += 1
+                    
+                    # 更新进度（总数未知，只显示已检查数量）
+                    emit_progress(f"  📄 检查文件 ({processed}): {file_name}")
+                    
+                    # 系统繁忙时放慢扫描
+                    self.adaptive_sleep()
                     
-                    # 检查是否为图像文件
-                    if manager.is_image_file(file_path):
-                        processed += 1
-                        
-                        # 更新进度
-                        if file_count > 0:
-                            progress = int((processed / file_count) * 100)
-                            self.progress_update.emit(f"  📄 检查文件 ({processed}/{file_count}, {progress}%): {os.path.basename(file_path)}")
-                        
-                        # 检查是否已处理过
-                        if not manager.is_file_processed(file_path):
-                            self.file_found.emit(f"🆕 发现未处理文件: {os.path.basename(file_path)}")
-                            
-                            # 处理文件
-                            self.process_file_safely(manager, file_path)
-                            count += 1
-                            
-                            # 每处理一个文件后休息，避免过度占用资源
-                            self.msleep(200)
-                        
-                        # 每检查10个文件休息一下
-                        if processed % 10 == 0:
-                            self.msleep(50)
+                    # 检查是否已处理过：没有记录的文件无需计算哈希
+                    record = processed_snapshot.get(record_key(file_path))
+                    if record is None:
+                        emit_progress(f"🆕 发现未处理文件: {file_name}")
+                        pending.add(executor.submit(self.process_file_safely, manager, file_path))
+                    else:
+                        pending.add(executor.submit(self.verify_and_process, manager, file_path, record))
+                    
+                    # 排队任务过多时等待部分完成，避免遍历远远跑在处理前面
+                    if len(pending) >= self.max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        count += sum(1 for future in done if future.result())
+                
+                for future in as_completed(pending):
+                    if self.should_stop:
+                        # 取消尚未开始的任务，正在处理的文件会继续完成
+                        for queued in pending:
+                            queued.cancel()
+                        break
+                    if future.result():
+                        count += 1
             
         except Exception as e:
             self.error_occurred.emit(f"扫描文件夹失败 {folder_path}: {str(e)}")
         
         return count
     
+    def all_recorded(self, images):
+        """目录中的图像是否都已有处理记录，只有这样的目录才写入缓存，新文件和处理失败的文件下次仍会检查"""
+        processed_snapshot = self.processed_snapshot
+        return all(record_key(entry.path) in processed_snapshot for entry in images)
+    
+    def cache_fingerprint(self, manager):
+        """目录缓存依赖的输入：跳过的目录列表和处理记录文件的 (inode, 大小)
+        
+        记录文件只追加写入，大小增长不影响缓存；被删除、重置或压缩重写时inode改变或大小变小
+        """
+        try:
+            st = os.stat(manager.log_file_path)
+            records = [st.st_ino, st.st_size]
+        except OSError:
+            records = None
+        return {'skip_dirs': sorted(self.skip_dirs), 'records': records}
+    
+    def load_dir_cache(self):
+        """加载目录修改时间缓存，跳过目录列表或处理记录文件变化时整体丢弃"""
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        # 旧版缓存没有指纹，同样丢弃
+        fingerprint = self._cache_fingerprint
+        if not isinstance(cache, dict) or cache.get('skip_dirs') != fingerprint['skip_dirs']:
+            return {}
+        saved_records = cache.get('records')
+        records = fingerprint['records']
+        if (not saved_records or records is None
+                or records[0] != saved_records[0] or records[1] < saved_records[1]):
+            return {}
+        return cache.get('dirs', {})
+    
+    def save_dir_cache(self):
+        """保存本次扫描访问到的目录缓存（指纹取扫描开始时的状态，与本次使用的处理记录快照对应）"""
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({**self._cache_fingerprint, 'dirs': self.dir_cache.new_entries}, f, ensure_ascii=False)
+        except OSError as e:
+            self.emit_progress(f"⚠️ 保存扫描缓存失败: {str(e)}")
+    
+    def verify_and_process(self, manager, file_path, record):
+        """比对已记录文件的修改时间、大小和哈希，文件被修改过时重新处理
+        
+        Returns:
+            bool: 是否处理了该文件
+        """
+        if self.should_stop:
+            return False
+        try:
+            if manager.matches_record(file_path, record):
+                return False
+        except OSError as e:
+            # 无权限、网络共享断开等，跳过该文件，继续扫描其余文件
+            self.emit_progress(f"⚠️ 无法检查文件: {os.path.basename(file_path)} - {str(e)}")
+            return False
+        
+        self.emit_progress(f"🆕 发现未处理文件: {os.path.basename(file_path)}")
+        return self.process_file_safely(manager, file_path)
+    
     def process_file_safely(self, manager, file_path):
         """安全地处理单个文件"""
         try:
-            from monitoring_manager import ProcessingWorker
-            
-            # 创建处理工作器并直接执行
-            worker = ProcessingWorker(file_path, "扫描发现", manager)
-            worker.process_file()
+            # 复用当前线程的处理工作器
+            worker = getattr(self._worker_local, 'worker', None)
+            if worker is None:
+                worker = ProcessingWorker("扫描发现", manager)
+                self._worker_local.worker = worker
+            worker.process(file_path)
             
-            self.progress_update.emit(f"  ✅ 处理完成: {os.path.basename(file_path)}")
+            self.emit_progress(f"  ✅ 处理完成: {os.path.basename(file_path)}")
             
         except Exception as e:
             self.error_occurred.emit(f"处理文件失败 {os.path.basename(file_path)}: {str(e)}")
+        
+        return True
+    
+    def adaptive_sleep(self):
+        """按CPU占用自适应限速：每16个文件采样一次（非阻塞），
+        平滑后的占用低于阈值时不休眠，超过阈值后按超出量线性增加休眠时间"""
+        if not PSUTIL_AVAILABLE or self.cpu_limit <= 0:
+            return
+        
+        self._pace_counter += 1
+        if self._pace_counter % 16 == 0:
+            self._ewma_cpu = 0.7 * self._ewma_cpu + 0.3 * psutil.cpu_percent(interval=None)
+        
+        delay = int((self._ewma_cpu - self.cpu_limit) * 2)
+        if delay > 0:
+            self.msleep(delay)
+    
+    def emit_progress(self, message):
+        """缓存一条进度消息，累计256条或距上次发送超过100毫秒时批量发送"""
+        with self._msgs_lock:
+            self._pending_msgs.append(message)
+            now = time.monotonic()
+            if len(self._pending_msgs) < 256 and now - self._last_flush < 0.1:
+                return
+            batch = self._pending_msgs
+            self._pending_msgs = []
+            self._last_flush = now
+        self.progress_batch.emit(batch)
+    
+    def flush_progress(self):
+        """立即发送缓存中的进度消息"""
+        with self._msgs_lock:
+            batch = self._pending_msgs
+            self._pending_msgs = []
+            self._last_flush = time.monotonic()
+        if batch:
+            self.progress_batch.emit(batch)
     
     def stop_scan(self):
         """停止扫描"""
@@ -143,14 +407,60 @@ class ScanWorker(QThread):
 class MainWindow(QMainWindow):
     """主窗口 - Image Privacy Guardian 的命令中心"""
     
+    # 日志保留的最大行数（界面和保存的日志相同）
+    LOG_MAX_LINES = 2000
+    
+    # 统计信息标签文本
+    STATS_TEMPLATE = "监控文件夹: {}\n处理文件: {}\n成功: {}\n失败: {}"
+    
+    # 统计和日志分区共用的标题样式
+    STYLE_SECTION_TITLE = """
+        QLabel {
+            background-color: #1e3a8a;
+            color: white;
+            padding: 10px 15px;
+            border-radius: 6px;
+            font-weight: bold;
+            font-size: 16px;
+            margin: 2px;
+        }
+    """
+    
+    # 关于对话框样式
+    STYLE_ABOUT_DIALOG = """
+        QMessageBox {
+            background-color: #f8f9fa;
+        }
+        QMessageBox QLabel {
+            color: #2c3e50;
+            font-size: 12px;
+        }
+    """
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("🛡️ Image Privacy Guardian - 图像隐私守护者")
         self.setGeometry(100, 100, 1000, 950)
         self.setMinimumSize(800, 950)
         
+        # 日志环形缓冲区：只保留最近的日志行，由定时器批量刷新到界面
+        self._log_buf = collections.deque(maxlen=self.LOG_MAX_LINES)
+        self._log_pending = collections.deque()  # 尚未显示到界面的日志行
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.timeout.connect(self._flush_log)
+        self._log_flush_timer.start(100)
+        
+        # 延迟保存的配置：短时间内的多次修改合并为一次写入
+        self._pending_configs = {}
+        self._config_save_timer = QTimer(self)
+        self._config_save_timer.setSingleShot(True)
+        self._config_save_timer.setInterval(500)
+        self._config_save_timer.timeout.connect(self._flush_configs)
+        
         # 监控的文件夹列表
         self.monitored_folders = []
+        # 已监控文件夹的比较键集合，与列表保持同步，用于O(1)判断重复
+        self._monitored_keys = set()
         
         # 监控管理器
         self.monitoring_manager = None
@@ -165,31 +475,30 @@ class MainWindow(QMainWindow):
         # 监控状态
         self.is_monitoring = False
         
+        # 手动扫描线程
+        self.scan_worker = None
+        
         # 定时扫描相关
         self.auto_scan_timer = QTimer()
         self.auto_scan_timer.timeout.connect(self.perform_auto_scan)
         self.auto_scan_interval = 300000  # 默认5分钟 (300秒 * 1000毫秒)
         self.is_auto_scanning = False
+        self.last_full_auto_scan = 0.0  # 上次完整定时扫描的时间（time.monotonic）
+        self._auto_scan_manager = None  # 定时扫描复用的监控管理器
+        self._auto_scan_thread = None  # 执行定时扫描的后台线程
+        self._auto_scan_stop = threading.Event()  # 通知后台定时扫描尽快结束
         
         # 存储标题标签的引用，用于字体自适应
         self.title_labels = []
         
-        # 设置主窗口样式 - 采用简洁的蓝色配色方案
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #f8f9fa;
-                color: #1e3a8a;
-            }
-            QLabel#title {
-                font-size: 18px;
-                font-weight: bold;
-                color: #ffffff;
-                background-color: #1e3a8a;
-                padding: 15px;
-                border-radius: 8px;
-                margin: 5px;
-            }
-        """)
+        # README内容缓存 (修改时间, 内容)
+        self._readme_cache = None
+        # 关于对话框，首次打开时创建，之后复用
+        self._about_dialog = None
+        self._about_readme = None
+        
+        # 设置主窗口样式 - 采用简洁的蓝色配色方案（含状态切换按钮的样式，只解析一次）
+        self.setStyleSheet(MAIN_WINDOW_STYLE)
         
         self.setup_ui()
         self.setup_connections()
@@ -426,27 +735,8 @@ class MainWindow(QMainWindow):
         # 主控制按钮
         self.main_control_btn = QPushButton("🛡️ 开始监控")
         self.main_control_btn.setMinimumHeight(45)
-        self.main_control_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #3b82f6;
-                color: white;
-                border: none;
-                padding: 12px 16px;
-                border-radius: 8px;
-                font-size: 13px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #2563eb;
-            }
-            QPushButton:pressed {
-                background-color: #1d4ed8;
-            }
-            QPushButton:disabled {
-                background-color: #e5e7eb;
-                color: #9ca3af;
-            }
-        """)
+        self.main_control_btn.setObjectName("mainControl")
+        self.main_control_btn.setProperty("state", "idle")
         self.main_control_btn.setEnabled(False)
         control_layout.addWidget(self.main_control_btn)
         
@@ -456,52 +746,14 @@ class MainWindow(QMainWindow):
         
         self.manual_scan_btn = QPushButton("🔍 一键扫描")
         self.manual_scan_btn.setMinimumHeight(45)
-        self.manual_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #059669;
-                color: white;
-                border: none;
-                padding: 12px 16px;
-                border-radius: 8px;
-                font-weight: bold;
-                font-size: 13px;
-            }
-            QPushButton:hover {
-                background-color: #047857;
-            }
-            QPushButton:pressed {
-                background-color: #065f46;
-            }
-            QPushButton:disabled {
-                background-color: #e5e7eb;
-                color: #9ca3af;
-            }
-        """)
+        self.manual_scan_btn.setObjectName("manualScan")
+        self.manual_scan_btn.setProperty("state", "idle")
         self.manual_scan_btn.setToolTip("立即扫描所有监控文件夹中的未处理文件")
         
         self.auto_scan_btn = QPushButton("⏰ 定时扫描")
         self.auto_scan_btn.setMinimumHeight(45)
-        self.auto_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #7c3aed;
-                color: white;
-                border: none;
-                padding: 12px 16px;
-                border-radius: 8px;
-                font-weight: bold;
-                font-size: 13px;
-            }
-            QPushButton:hover {
-                background-color: #6d28d9;
-            }
-            QPushButton:pressed {
-                background-color: #5b21b6;
-            }
-            QPushButton:disabled {
-                background-color: #e5e7eb;
-                color: #9ca3af;
-            }
-        """)
+        self.auto_scan_btn.setObjectName("autoScan")
+        self.auto_scan_btn.setProperty("state", "idle")
         self.auto_scan_btn.setToolTip("开启/关闭定时扫描功能")
         self.auto_scan_btn.setCheckable(True)
         
@@ -547,17 +799,7 @@ class MainWindow(QMainWindow):
         
         # 自定义标题标签
         stats_title = QLabel("📊 监控统计")
-        stats_title.setStyleSheet("""
-            QLabel {
-                background-color: #1e3a8a;
-                color: white;
-                padding: 10px 15px;
-                border-radius: 6px;
-                font-weight: bold;
-                font-size: 16px;
-                margin: 2px;
-            }
-        """)
+        stats_title.setStyleSheet(self.STYLE_SECTION_TITLE)
         stats_title.setAlignment(Qt.AlignCenter)
         stats_main_layout.addWidget(stats_title)
         self.title_labels.append(stats_title)
@@ -567,7 +809,8 @@ class MainWindow(QMainWindow):
         stats_layout = QVBoxLayout(stats_group)
         stats_layout.setContentsMargins(10, 10, 10, 10)
         
-        self.stats_label = QLabel("监控文件夹: 0\n处理文件: 0\n成功: 0\n失败: 0")
+        self._last_stats = (0, 0, 0, 0)
+        self.stats_label = QLabel(self.STATS_TEMPLATE.format(*self._last_stats))
         self.stats_label.setStyleSheet("""
             QLabel {
                 background-color: #f1f5f9;
@@ -603,17 +846,7 @@ class MainWindow(QMainWindow):
         
         # 自定义标题标签
         log_title = QLabel("📝 实时日志")
-        log_title.setStyleSheet("""
-            QLabel {
-                background-color: #1e3a8a;
-                color: white;
-                padding: 10px 15px;
-                border-radius: 6px;
-                font-weight: bold;
-                font-size: 16px;
-                margin: 2px;
-            }
-        """)
+        log_title.setStyleSheet(self.STYLE_SECTION_TITLE)
         log_title.setAlignment(Qt.AlignCenter)
         log_main_layout.addWidget(log_title)
         self.title_labels.append(log_title)
@@ -624,10 +857,12 @@ class MainWindow(QMainWindow):
         log_layout.setContentsMargins(10, 10, 10, 10)
         
         # 日志文本区域
-        self.log_text = QTextEdit()
+        # 纯文本控件，不做富文本排版，超过上限的旧行自动丢弃
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(self.LOG_MAX_LINES)
         self.log_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #f1f5f9;
                 color: #1e3a8a;
                 border: 1px solid #bfdbfe;
@@ -706,22 +941,35 @@ class MainWindow(QMainWindow):
             self, "选择要监控的文件夹", ""
         )
         
-        if folder_path and folder_path not in self.monitored_folders:
-            self.monitored_folders.append(folder_path)
-            
-            # 添加到列表显示
-            item = QListWidgetItem(f"📁 {folder_path}")
-            self.folder_list.addItem(item)
-            
-            # 保存配置
-            self.save_config('folders', self.monitored_folders)
-            
-            # 更新UI状态
-            self.update_ui_state()
-            self.log_message(f"✅ 已添加监控文件夹: {folder_path}")
-            
-        elif folder_path in self.monitored_folders:
+        if not folder_path:
+            return
+        
+        # 同一路径的不同写法或已被现有文件夹包含时不再添加
+        if folder_key(folder_path) in self._monitored_keys:
             QMessageBox.information(self, "提示", "该文件夹已在监控列表中")
+            return
+        folders = dedupe_folders(self.monitored_folders + [folder_path])
+        if folder_path not in folders:
+            QMessageBox.information(self, "提示", "该文件夹已在监控列表中（或已被列表中的文件夹包含）")
+            return
+        
+        # 新文件夹包含的现有子文件夹会被合并
+        for folder in self.monitored_folders:
+            if folder not in folders:
+                self.log_message(f"🔗 已合并到新添加的文件夹: {folder}")
+        
+        self.monitored_folders = folders
+        self._monitored_keys = {folder_key(folder) for folder in folders}
+        
+        # 刷新列表显示
+        self.refresh_folder_list(self.monitored_folders)
+        
+        # 保存配置
+        self.save_config_later('folders', self.monitored_folders)
+        
+        # 更新UI状态
+        self.update_ui_state()
+        self.log_message(f"✅ 已添加监控文件夹: {folder_path}")
             
     def remove_folder(self):
         """移除监控文件夹"""
@@ -731,10 +979,11 @@ class MainWindow(QMainWindow):
             
             # 从列表中移除
             self.monitored_folders.pop(current_row)
+            self._monitored_keys.discard(folder_key(folder_path))
             self.folder_list.takeItem(current_row)
             
             # 保存配置
-            self.save_config('folders', self.monitored_folders)
+            self.save_config_later('folders', self.monitored_folders)
             
             # 更新UI状态
             self.update_ui_state()
@@ -742,6 +991,20 @@ class MainWindow(QMainWindow):
         else:
             self.log_message("⚠️ 请先选择要移除的文件夹")
             
+    def refresh_folder_list(self, folders):
+        """批量重建文件夹列表显示，期间暂停重绘和信号，完成后统一刷新一次"""
+        self.folder_list.setUpdatesEnabled(False)
+        self.folder_list.blockSignals(True)
+        try:
+            self.folder_list.clear()
+            self.folder_list.addItems([f"📁 {folder}" for folder in folders])
+        finally:
+            self.folder_list.blockSignals(False)
+            self.folder_list.setUpdatesEnabled(True)
+        
+        # 选择变化信号被屏蔽，手动同步按钮状态
+        self.on_folder_selection_changed()
+        
     def on_folder_selection_changed(self):
         """文件夹选择变化"""
         has_selection = self.folder_list.currentRow() >= 0
@@ -763,7 +1026,9 @@ class MainWindow(QMainWindow):
         try:
             # 创建监控线程
             self.monitoring_thread = QThread()
-            self.monitoring_manager = MonitoringManager(backup_folder=self.backup_folder)
+            self.monitoring_manager = MonitoringManager(
+                backup_folder=self.backup_folder,
+                skip_dirs=self.app_config.get('scan_skip_dirs', DEFAULT_SKIP_DIRS))
             self.monitoring_manager.moveToThread(self.monitoring_thread)
             
             # 连接信号
@@ -783,23 +1048,7 @@ class MainWindow(QMainWindow):
             # 更新UI状态
             self.is_monitoring = True
             self.main_control_btn.setText("🛑 停止监控")
-            self.main_control_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #6c757d;
-                    color: white;
-                    border: none;
-                    padding: 12px;
-                    border-radius: 8px;
-                    font-size: 14px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #5a6268;
-                }
-                QPushButton:pressed {
-                    background-color: #495057;
-                }
-            """)
+            self.set_button_state(self.main_control_btn, "active")
             
             # 禁用文件夹操作
             self.add_folder_btn.setEnabled(False)
@@ -824,23 +1073,7 @@ class MainWindow(QMainWindow):
             # 更新UI状态
             self.is_monitoring = False
             self.main_control_btn.setText("🛡️ 开始监控")
-            self.main_control_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #2c3e50;
-                    color: white;
-                    border: none;
-                    padding: 12px;
-                    border-radius: 8px;
-                    font-size: 14px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #34495e;
-                }
-                QPushButton:pressed {
-                    background-color: #1a252f;
-                }
-            """)
+            self.set_button_state(self.main_control_btn, "stopped")
             
             # 启用文件夹操作
             self.add_folder_btn.setEnabled(True)
@@ -878,7 +1111,7 @@ class MainWindow(QMainWindow):
                 
     def set_backup_folder(self):
         """设置备份文件夹"""
-        current_backup = getattr(self, 'backup_folder', os.path.join(os.getcwd(), '_AEGIS_BACKUP'))
+        current_backup = getattr(self, 'backup_folder', DEFAULT_BACKUP_FOLDER)
         
         folder = QFileDialog.getExistingDirectory(
             self, "选择备份文件夹", current_backup
@@ -899,7 +1132,17 @@ class MainWindow(QMainWindow):
             # 如果正在监控，更新监控管理器的备份路径
             if self.is_monitoring and self.monitoring_manager:
                 self.monitoring_manager.backup_folder = folder
+            if self._auto_scan_manager:
+                self._auto_scan_manager.backup_folder = folder
                 
+    def set_button_state(self, button, state):
+        """切换按钮的state属性，重新polish使样式表中对应的样式生效"""
+        if button.property("state") == state:
+            return
+        button.setProperty("state", state)
+        button.style().unpolish(button)
+        button.style().polish(button)
+        
     def update_ui_state(self):
         """更新UI状态"""
         has_folders = len(self.monitored_folders) > 0
@@ -914,26 +1157,38 @@ class MainWindow(QMainWindow):
         })
         
     def update_stats(self, stats):
-        """更新统计信息"""
-        self.stats_label.setText(
-            f"监控文件夹: {stats.get('folders', 0)}\n"
-            f"处理文件: {stats.get('processed', 0)}\n"
-            f"成功: {stats.get('success', 0)}\n"
-            f"失败: {stats.get('failed', 0)}"
-        )
+        """更新统计信息，数值未变化时不重新设置标签"""
+        key = (stats.get('folders', 0), stats.get('processed', 0),
+               stats.get('success', 0), stats.get('failed', 0))
+        if key == self._last_stats:
+            return
+        self._last_stats = key
+        self.stats_label.setText(self.STATS_TEMPLATE.format(*key))
         
     def log_message(self, message):
-        """添加日志消息"""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}"
-        
-        self.log_text.append(formatted_message)
+        """添加日志消息，message也可以是消息列表，一次性追加"""
+        # time.strftime默认使用本地时间，不需要创建datetime对象
+        timestamp = time.strftime("%H:%M:%S")
+        if isinstance(message, list):
+            lines = [f"[{timestamp}] {line}" for line in message]
+            self._log_buf.extend(lines)
+            self._log_pending.extend(lines)
+        else:
+            line = f"[{timestamp}] {message}"
+            self._log_buf.append(line)
+            self._log_pending.append(line)
+    
+    def _flush_log(self):
+        """将新增的日志行追加到界面（由定时器每100毫秒调用）"""
+        pending = self._log_pending
+        if not pending:
+            return
         
-        # 自动滚动到底部
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(cursor.End)
-        self.log_text.setTextCursor(cursor)
+        lines = []
+        while pending:
+            lines.append(pending.popleft())
+        # 只追加新行，不重建整个文档；视图停在底部时自动跟随滚动
+        self.log_text.appendPlainText("\n".join(lines[-self.LOG_MAX_LINES:]))
         
     def on_monitoring_error(self, error_message):
         """处理监控错误"""
@@ -942,6 +1197,8 @@ class MainWindow(QMainWindow):
         
     def clear_log(self):
         """清空日志"""
+        self._log_buf.clear()
+        self._log_pending.clear()
         self.log_text.clear()
         self.log_message("📝 日志已清空")
         
@@ -954,7 +1211,7 @@ class MainWindow(QMainWindow):
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.log_text.toPlainText())
+                    f.write("\n".join(self._log_buf))
                 self.log_message(f"💾 日志已保存到: {file_path}")
             except Exception as e:
                 QMessageBox.warning(self, "错误", f"保存日志失败: {str(e)}")
@@ -976,6 +1233,9 @@ class MainWindow(QMainWindow):
             'ui': os.path.join(self.config_dir, 'ui_settings.json')
         }
         
+        # 各配置文件最近一次读写内容的摘要，内容未变化时跳过写入
+        self._config_digests = {}
+        
     def load_basic_configs(self):
         """加载基础配置（不包括UI设置）"""
         # 加载应用配置
@@ -983,7 +1243,9 @@ class MainWindow(QMainWindow):
             'auto_start_monitoring': False,
             'minimize_to_tray': False,
             'auto_save_logs': True,
-            'log_level': 'INFO'
+            'log_level': 'INFO',
+            'scan_cpu_limit': 70,
+            'auto_scan_max_interval_minutes': 60
         })
         
         # 加载高级设置配置
@@ -994,12 +1256,13 @@ class MainWindow(QMainWindow):
             'min_saturation': 50,
             'min_value': 50,
             'median_blur_kernel': 5,
-            'morphology_iterations': 2
+            'morphology_iterations': 2,
+            'lossless_strip': False
         })
         
         # 加载备份配置
         backup_config = self.load_config('backup', {
-            'backup_folder': os.path.join(os.getcwd(), '_AEGIS_BACKUP'),
+            'backup_folder': DEFAULT_BACKUP_FOLDER,
             'auto_cleanup': False,
             'max_backup_days': 30
         })
@@ -1007,6 +1270,7 @@ class MainWindow(QMainWindow):
         
         # 加载监控文件夹列表
         self.monitored_folders = self.load_config('folders', [])
+        self._monitored_keys = {folder_key(folder) for folder in self.monitored_folders}
         
     def load_all_configs(self):
         """加载所有配置（包括UI设置）"""
@@ -1033,52 +1297,97 @@ class MainWindow(QMainWindow):
             return default_value
             
         try:
-            if os.path.exists(config_file):
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                # 如果配置文件不存在，创建默认配置
-                self.save_config(config_type, default_value)
-                return default_value
+            # 直接打开，省去单独的存在性检查
+            with open(config_file, 'rb') as f:
+                data = f.read()
+            self._config_digests[config_type] = hashlib.blake2b(data, digest_size=16).digest()
+            return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+        except FileNotFoundError:
+            # 如果配置文件不存在，创建默认配置
+            self.save_config(config_type, default_value)
+            return default_value
         except Exception as e:
             self.log_message(f"⚠️ 加载配置失败 ({config_type}): {str(e)}")
             return default_value
             
     def save_config(self, config_type, config_data):
         """保存指定类型的配置"""
+        try:
+            data = dumps_config(config_data)
+        except Exception as e:
+            self.log_message(f"⚠️ 保存配置失败 ({config_type}): {str(e)}")
+            return False
+        return self.write_config(config_type, data)
+        
+    def write_config(self, config_type, data):
+        """将序列化好的配置字节写入对应的配置文件"""
         config_file = self.config_files.get(config_type)
         if not config_file:
             return False
             
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if self._config_digests.get(config_type) == digest and os.path.exists(config_file):
+            return True
+            
         try:
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+            # 先写临时文件再原子替换，保存中途崩溃不会损坏原配置；
+            # 数据已是完整的字节串，不经过Python缓冲层，一次write直接写入
+            temp_file = config_file + '.tmp'
+            with open(temp_file, 'wb', buffering=0) as f:
+                f.write(data)
+            os.replace(temp_file, config_file)
+            self._config_digests[config_type] = digest
             return True
         except Exception as e:
             self.log_message(f"⚠️ 保存配置失败 ({config_type}): {str(e)}")
             return False
             
+    def save_config_later(self, config_type, config_data):
+        """延迟500毫秒保存配置，期间的重复保存只写入最后一次的数据"""
+        self._pending_configs[config_type] = config_data
+        self._config_save_timer.start()
+        
+    def _flush_configs(self):
+        """写入所有延迟保存的配置"""
+        pending = self._pending_configs
+        self._pending_configs = {}
+        for config_type, config_data in pending.items():
+            self.save_config(config_type, config_data)
+            
     def save_all_configs(self):
         """保存所有配置"""
-        # 保存应用配置
-        self.save_config('app', self.app_config)
-        
-        # 保存高级设置配置
-        self.save_config('advanced', self.advanced_config)
+        # 下面会同步保存全部配置，取消尚未写入的延迟保存
+        self._config_save_timer.stop()
+        self._pending_configs = {}
         
-        # 保存备份配置
+        # 备份配置
         backup_config = {
             'backup_folder': self.backup_folder,
             'auto_cleanup': getattr(self, 'auto_cleanup', False),
             'max_backup_days': getattr(self, 'max_backup_days', 30)
         }
-        self.save_config('backup', backup_config)
         
-        # 保存监控文件夹列表
-        self.save_config('folders', self.monitored_folders)
+        # UI设置
+        self.update_window_geometry()
         
-        # 保存UI设置
-        self.save_ui_settings()
+        configs = {
+            'app': self.app_config,
+            'advanced': self.advanced_config,
+            'backup': backup_config,
+            'folders': self.monitored_folders,
+            'ui': self.ui_settings
+        }
+        
+        # 先完成全部序列化，再集中写入文件
+        blobs = {}
+        for config_type, config_data in configs.items():
+            try:
+                blobs[config_type] = dumps_config(config_data)
+            except Exception as e:
+                self.log_message(f"⚠️ 保存配置失败 ({config_type}): {str(e)}")
+        
+        for config_type, data in blobs.items():
+            self.write_config(config_type, data)
         
     def apply_ui_settings(self):
         """应用UI设置"""
@@ -1092,27 +1401,31 @@ class MainWindow(QMainWindow):
                 
         # 恢复监控文件夹列表显示（只有在UI已初始化时才执行）
         if hasattr(self, 'folder_list') and self.monitored_folders:
-            # 清空现有列表，避免重复
-            self.folder_list.clear()
-            
-            # 先过滤出存在的文件夹
+            # 先过滤出存在的文件夹，再去除重复和嵌套的文件夹
             valid_folders = []
             for folder in self.monitored_folders:
                 if os.path.exists(folder):
                     valid_folders.append(folder)
-                    item = QListWidgetItem(f"📁 {folder}")
-                    self.folder_list.addItem(item)
                 else:
                     self.log_message(f"⚠️ 文件夹不存在，已自动移除: {folder}")
+            valid_folders = dedupe_folders(valid_folders)
+            
+            # 重建列表显示（清空现有列表，避免重复）
+            self.refresh_folder_list(valid_folders)
             
             # 更新监控文件夹列表（只保留存在的文件夹）
             if len(valid_folders) != len(self.monitored_folders):
                 self.monitored_folders = valid_folders
-                self.save_config('folders', self.monitored_folders)
+                self._monitored_keys = {folder_key(folder) for folder in valid_folders}
+                self.save_config_later('folders', self.monitored_folders)
                 
     def save_ui_settings(self):
         """保存UI设置"""
-        # 保存窗口几何信息
+        self.update_window_geometry()
+        self.save_config('ui', self.ui_settings)
+        
+    def update_window_geometry(self):
+        """将当前窗口几何信息写入UI设置"""
         geometry = self.geometry()
         self.ui_settings['window_geometry'] = {
             'x': geometry.x(),
@@ -1121,8 +1434,6 @@ class MainWindow(QMainWindow):
             'height': geometry.height()
         }
         
-        self.save_config('ui', self.ui_settings)
-        
     def perform_manual_scan(self):
         """执行手动扫描"""
         if not self.monitored_folders:
@@ -1130,35 +1441,25 @@ class MainWindow(QMainWindow):
             return
         
         # 检查是否已经在扫描中
-        if hasattr(self, 'scan_worker') and self.scan_worker and self.scan_worker.isRunning():
+        if self.scan_worker and self.scan_worker.isRunning():
             QMessageBox.information(self, "提示", "扫描正在进行中，请稍候...")
             return
             
         self.log_message("🔍 开始手动扫描所有监控文件夹...")
         self.manual_scan_btn.setEnabled(True)
         self.manual_scan_btn.setText("⏹️ 停止扫描")
-        self.manual_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #dc2626;
-                color: white;
-                border: none;
-                padding: 12px 16px;
-                border-radius: 8px;
-                font-weight: bold;
-                font-size: 13px;
-            }
-            QPushButton:hover {
-                background-color: #b91c1c;
-            }
-            QPushButton:pressed {
-                background-color: #991b1b;
-            }
-        """)
+        self.set_button_state(self.manual_scan_btn, "active")
+        
+        # 原地改写文件不会改变目录修改时间，只有实时监控运行时才能跳过未变化的目录，
+        # 未启动监控时手动扫描是唯一的保障，需要逐个检查文件
+        cache_path = os.path.join(self.config_dir, 'scan_cache.json') if self.is_monitoring else None
         
         # 创建并启动扫描工作线程
-        self.scan_worker = ScanWorker(self.monitored_folders, self.backup_folder)
-        self.scan_worker.progress_update.connect(self.on_scan_progress)
-        self.scan_worker.file_found.connect(self.on_scan_file_found)
+        self.scan_worker = ScanWorker(self.monitored_folders, self.backup_folder,
+                                      self.app_config.get('scan_cpu_limit', 70),
+                                      cache_path,
+                                      self.app_config.get('scan_skip_dirs', DEFAULT_SKIP_DIRS))
+        self.scan_worker.progress_batch.connect(self.on_scan_progress)
         self.scan_worker.scan_finished.connect(self.on_scan_finished)
         self.scan_worker.error_occurred.connect(self.on_scan_error)
         self.scan_worker.start()
@@ -1166,7 +1467,7 @@ class MainWindow(QMainWindow):
     def handle_manual_scan_click(self):
         """处理一键扫描按钮点击事件"""
         # 检查是否正在扫描
-        if hasattr(self, 'scan_worker') and self.scan_worker and self.scan_worker.isRunning():
+        if self.scan_worker and self.scan_worker.isRunning():
             # 正在扫描，执行停止操作
             self.scan_worker.stop_scan()
             self.manual_scan_btn.setText("🔄 停止中...")
@@ -1176,22 +1477,39 @@ class MainWindow(QMainWindow):
             # 没有在扫描，执行开始扫描
             self.perform_manual_scan()
     
-    def scan_folder_for_unprocessed_files(self, manager, folder_path):
-        """扫描文件夹中的未处理文件"""
+    def scan_folder_for_unprocessed_files(self, manager, folder_path, process_pool=None):
+        """扫描文件夹中的未处理文件
+        
+        Args:
+            manager: 监控管理器
+            folder_path: 要扫描的文件夹
+            process_pool: 处理文件用的线程池，为None时在当前线程中直接处理
+        """
         count = 0
         try:
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    
-                    # 检查是否为图像文件
-                    if manager.is_image_file(file_path):
-                        # 检查是否已处理过
-                        if not manager.is_file_processed(file_path):
-                            self.log_message(f"🆕 发现未处理文件: {os.path.basename(file_path)}")
-                            # 直接处理文件，不依赖监控状态
-                            self.process_single_file(manager, file_path, "扫描发现")
-                            count += 1
+            skip_dirs = self.app_config.get('scan_skip_dirs', DEFAULT_SKIP_DIRS)
+            # 一次性取得已处理记录的快照，未记录的文件无需计算哈希和加锁查询
+            processed = manager.snapshot_processed_files()
+            for entry in walk_images(folder_path, manager.is_image_name, skip_dirs, self.backup_folder):
+                if self._auto_scan_stop.is_set():
+                    break
+                file_path = entry.path
+                file_name = entry.name
+                # 检查是否已处理过（已记录的文件仍需比对记录，以发现被修改的文件）
+                record = processed.get(record_key(file_path))
+                try:
+                    changed = record is None or not manager.matches_record(file_path, record)
+                except OSError as e:
+                    self.log_message(f"⚠️ 无法检查文件: {file_name} - {str(e)}")
+                    continue
+                if changed:
+                    self.log_message(f"🆕 发现未处理文件: {file_name}")
+                    # 直接处理文件，不依赖监控状态
+                    if process_pool is None:
+                        self.process_single_file(manager, file_path, "扫描发现")
+                    else:
+                        process_pool.submit(self.process_single_file, manager, file_path, "扫描发现")
+                    count += 1
         except Exception as e:
             self.log_message(f"❌ 扫描文件夹失败 {folder_path}: {str(e)}")
         
@@ -1199,13 +1517,12 @@ class MainWindow(QMainWindow):
     
     def process_single_file(self, manager, file_path, event_type):
         """直接处理单个文件（不依赖监控状态）"""
+        if self._auto_scan_stop.is_set():
+            return
         try:
-            # 导入ProcessingWorker
-            from monitoring_manager import ProcessingWorker
-            
             # 创建处理工作器并直接执行
-            worker = ProcessingWorker(file_path, event_type, manager)
-            worker.process_file()
+            worker = ProcessingWorker(event_type, manager)
+            worker.process(file_path)
             
             self.log_message(f"✅ 处理完成: {os.path.basename(file_path)}")
             
@@ -1242,22 +1559,7 @@ class MainWindow(QMainWindow):
         self.is_auto_scanning = True
         
         self.auto_scan_btn.setText("⏰ 停止定时")
-        self.auto_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #dc2626;
-                color: white;
-                border: none;
-                padding: 8px 12px;
-                border-radius: 6px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #b91c1c;
-            }
-            QPushButton:pressed {
-                background-color: #991b1b;
-            }
-        """)
+        self.set_button_state(self.auto_scan_btn, "active")
         
         self.log_message(f"⏰ 定时扫描已启动，间隔: {interval_minutes} 分钟")
     
@@ -1267,22 +1569,7 @@ class MainWindow(QMainWindow):
         self.is_auto_scanning = False
         
         self.auto_scan_btn.setText("⏰ 定时扫描")
-        self.auto_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #7c3aed;
-                color: white;
-                border: none;
-                padding: 8px 12px;
-                border-radius: 6px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #6d28d9;
-            }
-            QPushButton:pressed {
-                background-color: #5b21b6;
-            }
-        """)
+        self.set_button_state(self.auto_scan_btn, "stopped")
         
         self.log_message("⏰ 定时扫描已停止")
     
@@ -1292,20 +1579,74 @@ class MainWindow(QMainWindow):
             self.log_message("⚠️ 没有监控文件夹，跳过定时扫描")
             return
         
+        # 上一轮扫描仍在后台进行时不重复启动
+        if self._auto_scan_thread is not None and self._auto_scan_thread.is_alive():
+            self.log_message("⏰ 上次定时扫描尚未结束，跳过本次扫描")
+            return
+        
+        # 实时监控运行中且没有收到文件事件时，变化已被实时监控处理，
+        # 只在超过最长间隔后做一次完整扫描兜底
+        now = time.monotonic()
+        max_interval = self.app_config.get('auto_scan_max_interval_minutes', 60) * 60
+        if (self.is_monitoring and self.monitoring_manager
+                and not self.monitoring_manager.has_pending_changes()
+                and now - self.last_full_auto_scan < max_interval):
+            return
+        
+        if self.monitoring_manager:
+            self.monitoring_manager.clear_pending_changes()
+        self.last_full_auto_scan = now
+        
         self.log_message("⏰ 执行定时扫描...")
         
         try:
-            # 创建临时的监控管理器进行扫描
-            temp_manager = MonitoringManager(backup_folder=self.backup_folder)
-            temp_manager.log_message.connect(self.log_message)
+            # 复用定时扫描专用的监控管理器，每轮扫描前在后台线程中重新加载处理记录
+            reload_records = self._auto_scan_manager is not None
+            if not reload_records:
+                self._auto_scan_manager = MonitoringManager(backup_folder=self.backup_folder)
+                self._auto_scan_manager.log_message.connect(self.log_message)
+            temp_manager = self._auto_scan_manager
+            
+            # 遍历和处理都在后台线程中进行，不阻塞界面
+            existing_folders = [folder for folder in self.monitored_folders if os.path.exists(folder)]
+            self._auto_scan_stop.clear()
+            self._auto_scan_thread = threading.Thread(
+                target=self.run_auto_scan, args=(temp_manager, existing_folders, reload_records),
+                daemon=True)
+            self._auto_scan_thread.start()
+                
+        except Exception as e:
+            self.log_message(f"❌ 定时扫描失败: {str(e)}")
+    
+    def run_auto_scan(self, manager, folders, reload_records=True):
+        """在后台线程中执行定时扫描
+        
+        各文件夹并行遍历，发现的未处理文件交给处理线程池，
+        图像处理与目录遍历同时进行（log_message只向线程安全的deque追加，可以在工作线程中调用）
+        
+        Args:
+            reload_records: 是否先重新加载处理记录（刚创建的管理器已加载过）
+        """
+        try:
+            # 记录文件可能很大，重新解析放在后台线程中，不阻塞界面
+            if reload_records:
+                manager.reload_processed_files()
             
             scan_count = 0
-            for folder in self.monitored_folders:
-                if os.path.exists(folder):
-                    folder_count = self.scan_folder_for_unprocessed_files(temp_manager, folder)
-                    scan_count += folder_count
+            if folders:
+                process_workers = min(8, os.cpu_count() or 4)
+                with ThreadPoolExecutor(max_workers=process_workers) as process_pool:
+                    with ThreadPoolExecutor(max_workers=min(8, len(folders))) as walk_pool:
+                        scan_count = sum(walk_pool.map(
+                            lambda folder: self.scan_folder_for_unprocessed_files(
+                                manager, folder, process_pool),
+                            folders))
+            
+            manager.flush_processed_files()
             
-            if scan_count > 0:
+            if self._auto_scan_stop.is_set():
+                self.log_message("⏰ 定时扫描已中止")
+            elif scan_count > 0:
                 self.log_message(f"⏰ 定时扫描完成，处理了 {scan_count} 个文件")
             else:
                 self.log_message("⏰ 定时扫描完成，没有发现新文件")
@@ -1313,39 +1654,15 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.log_message(f"❌ 定时扫描失败: {str(e)}")
     
-    def on_scan_progress(self, message):
-        """扫描进度更新回调"""
-        self.log_message(message)
-    
-    def on_scan_file_found(self, message):
-        """发现文件回调"""
-        self.log_message(message)
+    def on_scan_progress(self, messages):
+        """扫描进度更新回调（批量消息）"""
+        self.log_message(messages)
     
     def on_scan_finished(self, processed_count):
         """扫描完成回调"""
         self.manual_scan_btn.setEnabled(True)
         self.manual_scan_btn.setText("🔍 一键扫描")
-        self.manual_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #059669;
-                color: white;
-                border: none;
-                padding: 12px 16px;
-                border-radius: 8px;
-                font-weight: bold;
-                font-size: 13px;
-            }
-            QPushButton:hover {
-                background-color: #047857;
-            }
-            QPushButton:pressed {
-                background-color: #065f46;
-            }
-            QPushButton:disabled {
-                background-color: #e5e7eb;
-                color: #9ca3af;
-            }
-        """)
+        self.set_button_state(self.manual_scan_btn, "idle")
         
         if processed_count > 0:
             self.log_message(f"✅ 手动扫描完成！共处理了 {processed_count} 个未处理文件")
@@ -1358,52 +1675,51 @@ class MainWindow(QMainWindow):
         """扫描错误回调"""
         self.manual_scan_btn.setEnabled(True)
         self.manual_scan_btn.setText("🔍 一键扫描")
-        self.manual_scan_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #059669;
-                color: white;
-                border: none;
-                padding: 12px 16px;
-                border-radius: 8px;
-                font-weight: bold;
-                font-size: 13px;
-            }
-            QPushButton:hover {
-                background-color: #047857;
-            }
-            QPushButton:pressed {
-                background-color: #065f46;
-            }
-            QPushButton:disabled {
-                background-color: #e5e7eb;
-                color: #9ca3af;
-            }
-        """)
+        self.set_button_state(self.manual_scan_btn, "idle")
         
         self.log_message(f"❌ 扫描过程中发生错误: {error_message}")
         QMessageBox.critical(self, "扫描错误", f"扫描过程中发生错误:\n{error_message}")
     
+    def read_readme(self):
+        """读取README.md内容，按文件修改时间缓存，文件未变化时不再重复读取"""
+        readme_path = os.path.join(os.path.dirname(__file__), "README.md")
+        try:
+            mtime = os.stat(readme_path).st_mtime_ns
+        except OSError:
+            return "README.md 文件未找到"
+        
+        if self._readme_cache is None or self._readme_cache[0] != mtime:
+            with open(readme_path, 'r', encoding='utf-8') as f:
+                self._readme_cache = (mtime, f.read())
+        return self._readme_cache[1]
+        
     def show_about_dialog(self):
         """显示关于对话框"""
         try:
             # 读取README.md文件内容
-            readme_path = os.path.join(os.path.dirname(__file__), "README.md")
-            if os.path.exists(readme_path):
-                with open(readme_path, 'r', encoding='utf-8') as f:
-                    readme_content = f.read()
-            else:
-                readme_content = "README.md 文件未找到"
+            readme_content = self.read_readme()
             
-            # 创建关于对话框
-            about_dialog = QMessageBox(self)
-            about_dialog.setWindowTitle("关于 Image Privacy Guardian")
-            about_dialog.setIcon(QMessageBox.Information)
+            if self._about_dialog is None:
+                self._about_dialog = self.create_about_dialog()
             
-            # 设置详细文本为README内容
-            about_dialog.setDetailedText(readme_content)
+            # README有变化时才更新详细文本
+            if readme_content is not self._about_readme:
+                self._about_dialog.setDetailedText(readme_content)
+                self._about_readme = readme_content
             
-            # 设置主要文本
-            about_dialog.setText("""
+            self._about_dialog.exec_()
+            
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"无法显示关于信息: {str(e)}")
+    
+    def create_about_dialog(self):
+        """创建关于对话框"""
+        about_dialog = QMessageBox(self)
+        about_dialog.setWindowTitle("关于 Image Privacy Guardian")
+        about_dialog.setIcon(QMessageBox.Information)
+        
+        # 设置主要文本
+        about_dialog.setText("""
 🛡️ Image Privacy Guardian - 图像隐私守护者
 
 版本: 1.0.0
@@ -1415,33 +1731,33 @@ class MainWindow(QMainWindow):
 
 点击"Show Details..."查看完整说明文档
             """)
-            
-            # 设置对话框样式
-            about_dialog.setStyleSheet("""
-                QMessageBox {
-                    background-color: #f8f9fa;
-                }
-                QMessageBox QLabel {
-                    color: #2c3e50;
-                    font-size: 12px;
-                }
-            """)
-            
-            about_dialog.exec_()
-            
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"无法显示关于信息: {str(e)}")
+        
+        # 设置对话框样式
+        about_dialog.setStyleSheet(self.STYLE_ABOUT_DIALOG)
+        return about_dialog
         
     def closeEvent(self, event):
         """窗口关闭事件"""
         # 停止扫描线程
-        if hasattr(self, 'scan_worker') and self.scan_worker and self.scan_worker.isRunning():
+        if self.scan_worker and self.scan_worker.isRunning():
             self.scan_worker.stop_scan()
             self.scan_worker.wait(3000)  # 等待最多3秒
         
         # 停止定时扫描
         if self.is_auto_scanning:
             self.stop_auto_scan()
+        auto_scan_running = self._auto_scan_thread is not None and self._auto_scan_thread.is_alive()
+        if auto_scan_running:
+            self._auto_scan_stop.set()
+            self._auto_scan_thread.join(3)  # 等待最多3秒
+            auto_scan_running = self._auto_scan_thread.is_alive()
+        # 后台扫描仍在使用时不释放管理器，随进程退出一并回收
+        if self._auto_scan_manager and not auto_scan_running:
+            self._auto_scan_manager.stats_timer.stop()
+            self._auto_scan_manager.save_timer.stop()
+            self._auto_scan_manager.flush_processed_files()
+            self._auto_scan_manager.deleteLater()
+            self._auto_scan_manager = None
         
         # 保存所有配置
         self.save_all_configs()
@@ -1475,8 +1791,13 @@ def main():
     window = MainWindow()
     window.show()
     
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    # 等待清理进程处理完已提交的文件后再退出
+    shutdown_clean_pool()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，清理进程池的子进程需要由此进入
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -4,23 +4,268 @@
 """
 
 import os
+import re
+import sys
+import ctypes
 import time
 import hashlib
 import json
 import shutil
 import threading
+import collections
+import multiprocessing
 from datetime import datetime
-from pathlib import Path
 from typing import List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from threading import Lock
 
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 
 from sanitizer_engine import ImageSanitizer
 
+# 导入fcntl支持（仅类Unix系统提供，用于在支持写时复制的文件系统上克隆备份文件）
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# 导入orjson支持（可选依赖，用于加速处理记录的序列化）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 扫描时不进入的目录（版本库元数据、依赖缓存、回收站、备份目录等）
+DEFAULT_SKIP_DIRS = ('.git', '.svn', '.hg', 'node_modules', '__pycache__', '_AEGIS_BACKUP',
+                     '.Trash', '$RECYCLE.BIN', 'System Volume Information')
+
+# 带时间戳的备份文件名，如 photo_20240101_120000.jpg
+_TIMESTAMP_PATTERN = re.compile(r'_\d{8}_\d{6}')
+
+# 事件处理时跳过的文件名（Office等程序的~开头临时文件、清理中间文件、失败和错误备份），
+# 合并为一个正则，一次扫描文件名完成判断
+_SKIP_NAME_PATTERN = re.compile(r'^~|_cleaned|_FAILED_|_ERROR_|\.aegis_temp')
+
+# Linux的FICLONE ioctl请求码（_IOW(0x94, 9, int)）
+_FICLONE = 0x40049409
+_FICLONE_SUPPORTED = FCNTL_AVAILABLE and sys.platform.startswith('linux')
+
+# 需要轮询监控的网络文件系统类型（Linux /proc/mounts中的名称）
+_NETWORK_FS_TYPES = frozenset({'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'ncpfs', 'afs', '9p',
+                               'fuse.sshfs', 'davfs', 'fuse.davfs2'})
+# Windows GetDriveTypeW 返回的网络驱动器类型
+_DRIVE_REMOTE = 4
+
+# 计算哈希时每次读取的字节数
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Python 3.11+ 的hashlib.file_digest在C层循环读取，省去逐块的Python调用
+_FILE_DIGEST_AVAILABLE = hasattr(hashlib, 'file_digest')
+# posix_fadvise只在Linux等系统上提供，Windows和macOS上不使用
+_FADVISE_AVAILABLE = hasattr(os, 'posix_fadvise')
+
+# 图像清理进程池（所有管理器共用，首次清理时创建）及清理进程内的清理器
+_clean_pool = None
+_clean_pool_lock = threading.Lock()
+_process_sanitizer = None
+
+
+def _copy_file(src, dst):
+    """复制文件并保留元数据
+    
+    Linux上先尝试FICLONE克隆（btrfs、XFS等写时复制文件系统上不复制数据块，瞬间完成），
+    不支持时回退到shutil.copy2
+    """
+    if _FICLONE_SUPPORTED:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass  # 文件系统不支持克隆或跨文件系统，回退到普通复制
+    return shutil.copy2(src, dst)
+
+
+def _needs_polling(folder):
+    """判断文件夹是否位于网络文件系统上
+    
+    系统的文件变化通知（inotify、ReadDirectoryChangesW）收不到其他机器对网络共享的修改，
+    这类文件夹需要改用轮询监控；本地文件夹使用原生通知，避免轮询反复stat整个目录树
+    """
+    path = os.path.realpath(folder)
+    if sys.platform == 'win32':
+        if path.startswith('\\\\'):
+            return True  # UNC路径
+        try:
+            drive = os.path.splitdrive(path)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == _DRIVE_REMOTE
+        except Exception:
+            return False
+    
+    if sys.platform.startswith('linux'):
+        # 在/proc/mounts中找到包含该路径的最长挂载点，按其文件系统类型判断
+        best_mount, fs_type = '', None
+        try:
+            with open('/proc/mounts', encoding='utf-8') as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 3:
+                        continue
+                    mount_point = fields[1].replace('\\040', ' ')
+                    if ((path == mount_point or path.startswith(mount_point.rstrip('/') + '/'))
+                            and len(mount_point) > len(best_mount)):
+                        best_mount, fs_type = mount_point, fields[2]
+        except OSError:
+            return False
+        return fs_type in _NETWORK_FS_TYPES
+    
+    return False
+
+
+def _path_prefix(path):
+    """返回规范化的目录路径前缀（以分隔符结尾），用于判断文件是否位于该目录内"""
+    key = os.path.normcase(os.path.abspath(path))
+    return key if key.endswith(os.sep) else key + os.sep
+
+
+def record_key(file_path):
+    """处理记录的键：规范化的绝对路径，同一文件的不同写法（大小写、分隔符、"."）对应同一条记录"""
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+def _dump_record(file_path, record):
+    """将一条处理记录序列化为日志中的一行（UTF-8字节串，以换行结尾）"""
+    line = {'path': file_path, **record}
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(line) + b'\n'
+    return json.dumps(line, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class DirCache:
+    """按目录修改时间跳过未变化目录的遍历缓存，供walk_images使用
+    
+    entries为上次遍历保存的 {目录路径: [修改时间ns, [子目录名]]}；修改时间未变的目录不再读取，
+    直接按缓存的子目录继续遍历。本次访问到的目录写入new_entries，
+    读取过的目录只有is_complete(该目录中的图像DirEntry列表)为True时才写入
+    """
+    
+    def __init__(self, entries, is_complete):
+        self.entries = entries
+        self.new_entries = {}
+        self.is_complete = is_complete
+
+
+def walk_images(root, is_image_name, skip_dirs=(), backup_folder=None, dir_cache=None):
+    """用os.scandir遍历目录树，产出图像文件的DirEntry
+    
+    跳过skip_dirs中的目录、以"."开头的隐藏目录和备份目录；
+    先做纯字符串的文件名判断，再用DirEntry自带的类型信息，不额外调用stat。
+    与os.walk相同，每个目录完整读取后才产出其中的文件。
+    传入dir_cache（DirCache）时，修改时间与缓存相同的目录不再读取，其中的文件也不会产出
+    """
+    skip_dirs = frozenset(skip_dirs)
+    backup_key = os.path.normcase(os.path.abspath(backup_folder)) if backup_folder else None
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        
+        if dir_cache is not None:
+            try:
+                # 在读取目录前取修改时间，遍历期间新增的文件会让下次遍历重新读取该目录
+                mtime = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            cached = dir_cache.entries.get(current)
+            if cached is not None and cached[0] == mtime:
+                dir_cache.new_entries[current] = cached
+                for name in cached[1]:
+                    stack.append(os.path.join(current, name))
+                continue
+        
+        images = []
+        subdirs = []
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        name = entry.name
+                        if is_image_name(name) and entry.is_file():
+                            images.append(entry)
+                        elif entry.is_dir(follow_symlinks=False):
+                            if (name in skip_dirs or name.startswith('.')
+                                    or os.path.normcase(os.path.abspath(entry.path)) == backup_key):
+                                continue
+                            subdirs.append(name)
+                            stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            # 与os.walk一致，跳过无法访问的目录
+            continue
+        
+        if dir_cache is not None and dir_cache.is_complete(images):
+            dir_cache.new_entries[current] = [mtime, subdirs]
+        
+        # 目录读完并关闭后再产出，调用方处理文件（替换文件）时不会影响正在进行的目录读取
+        yield from images
+
+
+def _init_clean_process():
+    """清理进程初始化：进程池已按CPU核数并行，每个进程内OpenCV只用一个线程，避免线程数成倍超额"""
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def _clean_in_process(file_path, advanced_config):
+    """在清理进程中清理图像（模块级函数，才能被进程池序列化调用）"""
+    global _process_sanitizer
+    if _process_sanitizer is None:
+        _process_sanitizer = ImageSanitizer()
+    return _process_sanitizer.clean_image(file_path, None, advanced_config)
+
+
+def get_clean_pool():
+    """获取图像清理进程池，无法创建时返回None（调用方在当前线程内清理）
+    
+    图像解码、去跟踪点和重新编码都是CPU密集型操作，放到独立进程中才能利用多核；
+    备份、哈希和记录等I/O操作仍在线程池中进行
+    """
+    global _clean_pool
+    with _clean_pool_lock:
+        if _clean_pool is None:
+            try:
+                # 统一使用spawn启动：fork多线程的Qt进程时，子进程可能继承被其他线程持有的锁
+                _clean_pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1),
+                                                  mp_context=multiprocessing.get_context('spawn'),
+                                                  initializer=_init_clean_process)
+            except (OSError, NotImplementedError, ImportError):
+                return None
+        return _clean_pool
+
+
+def shutdown_clean_pool():
+    """关闭图像清理进程池（程序退出时调用）"""
+    global _clean_pool
+    with _clean_pool_lock:
+        pool, _clean_pool = _clean_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _discard_clean_pool(pool):
+    """丢弃已损坏的进程池，下次清理时重新创建"""
+    global _clean_pool
+    with _clean_pool_lock:
+        if _clean_pool is pool:
+            _clean_pool = None
+    pool.shutdown(wait=False)
+
 
 class ImageFileHandler(FileSystemEventHandler):
     """图像文件事件处理器"""
@@ -28,8 +273,19 @@ class ImageFileHandler(FileSystemEventHandler):
     def __init__(self, monitoring_manager):
         super().__init__()
         self.monitoring_manager = monitoring_manager
-        self.processing_delay = 1.0  # 文件稳定等待时间
-        self.processed_in_session = set()  # 本次会话已处理的文件
+        self.processing_delay = 1.0  # 文件稳定等待时间：最后一次事件后经过该时间才处理
+        # 本次会话已处理的文件（按处理顺序，超过上限时淘汰最早的；
+        # 被淘汰的文件再有事件时仍会由处理记录判断是否需要处理）
+        self.processed_in_session = collections.OrderedDict()
+        self.max_session_entries = 4096
+        self.max_busy_retries = 10  # 文件持续被占用时最多重新等待的次数
+        
+        # 等待处理的文件 {file_path: [到期时间, 事件类型, 占用重试次数]}，
+        # 由一个分发线程统一计时，新事件只更新到期时间，不为每个事件创建线程
+        self.pending_files = {}
+        self.pending_cond = threading.Condition()
+        self.dispatch_thread = None
+        self.stopped = False
     
     def on_created(self, event):
         """文件创建事件"""
@@ -39,49 +295,130 @@ class ImageFileHandler(FileSystemEventHandler):
     def on_modified(self, event):
         """文件修改事件"""
         if not event.is_directory:
-            # 避免处理我们自己创建的临时文件
-            if ".aegis_temp" in event.src_path or "_cleaned" in event.src_path:
+            # 只改了属性或内容未变的修改事件（文件与处理记录的修改时间和大小一致）直接忽略
+            self.handle_file_event(event.src_path, "修改", skip_unchanged=True)
+    
+    def on_moved(self, event):
+        """文件移动/重命名事件（浏览器下载、编辑器保存常先写临时文件再重命名）"""
+        if not event.is_directory:
+            # 清理结果先写入.aegis_temp临时文件再替换原文件，这是我们自己的写回，
+            # 扫描时处理的文件不在processed_in_session中，需要在这里排除
+            if event.src_path.endswith('.aegis_temp'):
                 return
-            self.handle_file_event(event.src_path, "修改")
+            self.handle_file_event(event.dest_path, "移动", skip_unchanged=True)
     
-    def handle_file_event(self, file_path, event_type):
-        """处理文件事件"""
+    def handle_file_event(self, file_path, event_type, skip_unchanged=False):
+        """处理文件事件
+        
+        Args:
+            file_path: 文件路径
+            event_type: 事件类型（用于日志）
+            skip_unchanged: 为True时，文件与处理记录一致则不再安排处理
+        """
         try:
-            # 检查文件扩展名
-            if not self.monitoring_manager.is_image_file(file_path):
+            # 检查文件扩展名（文件名只取一次，后续判断都基于它）
+            file_name = os.path.basename(file_path)
+            if not self.monitoring_manager.is_image_name(file_name):
                 return
             
-            # 避免处理备份文件夹中的文件
-            if self.monitoring_manager.backup_folder in file_path:
+            # 避免处理临时文件、我们自己创建的中间文件和已清理的文件
+            if _SKIP_NAME_PATTERN.search(file_name):
                 return
             
-            # 避免处理临时文件和已清理的文件
-            file_name = os.path.basename(file_path)
-            if ('_cleaned' in file_name or '_FAILED_' in file_name or 
-                '_ERROR_' in file_name or file_name.startswith('~')):
+            # 避免处理备份文件夹中的文件
+            if self.monitoring_manager.is_in_backup_folder(file_path):
                 return
             
             # 过滤掉带时间戳的备份文件（防止处理已经备份的文件）
-            if '_20' in file_name and ('_FAILED_' in file_name or len(file_name.split('_')) > 3):
+            if '_20' in file_name and file_name.count('_') > 2:
                 return
             
             # 避免重复处理同一文件
             if file_path in self.processed_in_session:
                 return
             
-            # 等待文件稳定
-            self.wait_for_file_ready(file_path)
+            if skip_unchanged and self.monitoring_manager.has_unchanged_record(file_path):
+                return
+            
+            # 被过滤掉的事件（备份、临时文件、未变化的文件等）不触发下次定时扫描
+            self.monitoring_manager.pending_changes = True
+            # 合并连续事件：每次事件都重新计时，文件停止变化后才处理
+            self.schedule_file(file_path, event_type)
+            
+        except Exception as e:
+            self.monitoring_manager.log_message.emit(
+                f"❌ 处理文件事件失败: {file_path} - {str(e)}"
+            )
+    
+    def schedule_file(self, file_path, event_type, busy_retries=0):
+        """安排在processing_delay秒后处理文件，期间同一文件的新事件会重新计时"""
+        deadline = time.monotonic() + self.processing_delay
+        with self.pending_cond:
+            if self.stopped:
+                return
+            entry = self.pending_files.get(file_path)
+            if entry is not None:
+                # 保留最初的事件类型
+                entry[0] = deadline
+                entry[2] = max(entry[2], busy_retries)
+            else:
+                self.pending_files[file_path] = [deadline, event_type, busy_retries]
+            
+            if self.dispatch_thread is None:
+                self.dispatch_thread = threading.Thread(target=self.dispatch_loop, daemon=True)
+                self.dispatch_thread.start()
+            self.pending_cond.notify()
+    
+    def dispatch_loop(self):
+        """分发线程：等待最早到期的文件，到期后依次处理"""
+        while True:
+            with self.pending_cond:
+                while True:
+                    if self.stopped:
+                        return
+                    now = time.monotonic()
+                    due = [(path, entry) for path, entry in self.pending_files.items() if entry[0] <= now]
+                    if due:
+                        for path, _ in due:
+                            del self.pending_files[path]
+                        break
+                    timeout = None
+                    if self.pending_files:
+                        timeout = min(entry[0] for entry in self.pending_files.values()) - now
+                    self.pending_cond.wait(timeout)
             
-            # 再次检查文件是否存在
-            if not os.path.exists(file_path):
+            for path, (_, event_type, busy_retries) in due:
+                self.process_when_ready(path, event_type, busy_retries)
+    
+    def stop(self):
+        """停止分发线程，丢弃尚未到期的文件"""
+        with self.pending_cond:
+            self.stopped = True
+            self.pending_files.clear()
+            self.pending_cond.notify()
+    
+    def process_when_ready(self, file_path, event_type, busy_retries):
+        """计时结束后处理文件（在分发线程中执行）"""
+        try:
+            # 文件仍被其他程序占用（Windows上写入中的文件无法打开）时稍后再试
+            try:
+                with open(file_path, 'rb') as f:
+                    f.read(1)
+            except FileNotFoundError:
                 return
+            except OSError:
+                if busy_retries < self.max_busy_retries:
+                    self.schedule_file(file_path, event_type, busy_retries + 1)
+                    return
             
             # 检查文件是否已经被处理过
             if self.monitoring_manager.is_file_processed(file_path):
                 return
             
-            # 标记为本次会话已处理
-            self.processed_in_session.add(file_path)
+            # 标记为本次会话已处理（只在分发线程中写入）
+            self.processed_in_session[file_path] = None
+            if len(self.processed_in_session) > self.max_session_entries:
+                self.processed_in_session.popitem(last=False)
             
             # 提交处理任务
             self.monitoring_manager.submit_processing_task(file_path, event_type)
@@ -90,43 +427,21 @@ class ImageFileHandler(FileSystemEventHandler):
             self.monitoring_manager.log_message.emit(
                 f"❌ 处理文件事件失败: {file_path} - {str(e)}"
             )
-    
-    def wait_for_file_ready(self, file_path, max_wait=10):
-        """等待文件准备就绪"""
-        start_time = time.time()
-        last_size = -1
-        
-        while time.time() - start_time < max_wait:
-            try:
-                if not os.path.exists(file_path):
-                    time.sleep(0.1)
-                    continue
-                
-                current_size = os.path.getsize(file_path)
-                if current_size == last_size and current_size > 0:
-                    # 文件大小稳定，尝试打开文件
-                    try:
-                        with open(file_path, 'rb') as f:
-                            f.read(1)
-                        break  # 文件可以正常访问
-                    except:
-                        pass  # 文件仍在写入中
-                
-                last_size = current_size
-                time.sleep(self.processing_delay)
-                
-            except Exception:
-                time.sleep(0.1)
 
 
 class ProcessingWorker:
-    """处理工作器 - 在单独线程中处理单个文件"""
+    """处理工作器 - 可重复调用process依次处理多个文件（同一实例不能被多个线程同时使用）"""
     
-    def __init__(self, file_path: str, event_type: str, monitoring_manager):
-        self.file_path = file_path
+    def __init__(self, event_type: str, monitoring_manager):
+        self.file_path = None
         self.event_type = event_type
         self.monitoring_manager = monitoring_manager
-        self.sanitizer = ImageSanitizer()
+        self.sanitizer = monitoring_manager.sanitizer
+        
+    def process(self, file_path: str):
+        """处理指定文件"""
+        self.file_path = file_path
+        self.process_file()
         
     def process_file(self):
         """处理文件"""
@@ -152,7 +467,7 @@ class ProcessingWorker:
             )
             
             # 执行清理（直接替换原文件）
-            success = self.sanitizer.clean_image(self.file_path, None, self.monitoring_manager.advanced_config)
+            success = self.clean_image()
             
             if success:
                 # 成功处理
@@ -163,10 +478,6 @@ class ProcessingWorker:
                 if os.path.exists(backup_path):
                     os.remove(backup_path)
                     
-                # 计算处理后文件的哈希值
-                file_hash = self.monitoring_manager.calculate_file_hash(self.file_path)
-                hash_display = file_hash[:8] + "..." if file_hash else "未知"
-                
                 self.monitoring_manager.log_message.emit(
                     f"✅ 处理成功: {os.path.basename(self.file_path)}"
                 )
@@ -177,7 +488,12 @@ class ProcessingWorker:
             else:
                 # 处理失败，恢复备份
                 if os.path.exists(backup_path):
-                    shutil.move(backup_path, self.file_path)
+                    try:
+                        # 同一分区上直接原子覆盖；Windows上shutil.move遇到目标已存在会退化为复制+删除
+                        os.replace(backup_path, self.file_path)
+                    except OSError:
+                        # 备份文件夹在其他分区时无法重命名
+                        shutil.move(backup_path, self.file_path)
                 raise Exception("图像清理过程失败")
                 
         except FileNotFoundError:
@@ -188,6 +504,25 @@ class ProcessingWorker:
             if "系统找不到指定的文件" not in str(e):
                 self.handle_failure(str(e))
             
+    def clean_image(self):
+        """在清理进程池中清理图像，进程池无法创建或已关闭时在当前线程内清理"""
+        advanced_config = self.monitoring_manager.advanced_config
+        pool = get_clean_pool()
+        if pool is not None:
+            try:
+                return pool.submit(_clean_in_process, self.file_path, advanced_config).result()
+            except BrokenProcessPool:
+                # 清理进程异常退出（如解码崩溃、内存耗尽），可能正是这个文件导致的，
+                # 不在本进程中重试以免拖垮整个程序；丢弃进程池，后续文件使用新建的进程池
+                _discard_clean_pool(pool)
+                self.monitoring_manager.log_message.emit(
+                    f"❌ 清理进程异常退出: {os.path.basename(self.file_path)}")
+                return False
+            except RuntimeError:
+                # 进程池已在程序退出时关闭
+                pass
+        return self.sanitizer.clean_image(self.file_path, None, advanced_config)
+        
     def create_output_path(self):
         """创建输出路径"""
         file_dir = os.path.dirname(self.file_path)
@@ -211,7 +546,7 @@ class ProcessingWorker:
         try:
             # 只有在需要复制文件时才创建目录
             os.makedirs(os.path.dirname(backup_path), exist_ok=True)
-            shutil.copy2(self.file_path, backup_path)
+            _copy_file(self.file_path, backup_path)
         except Exception as e:
             raise Exception(f"创建备份失败: {str(e)}")
         
@@ -230,7 +565,7 @@ class ProcessingWorker:
                     os.makedirs(os.path.dirname(backup_path), exist_ok=True)
                     
                     # 复制失败文件到备份目录（保留原文件在监控文件夹中）
-                    shutil.copy2(self.file_path, backup_path)
+                    _copy_file(self.file_path, backup_path)
                     
                     # 创建错误日志（放在同一目录）
                     file_name = os.path.basename(self.file_path)
@@ -280,19 +615,18 @@ class ProcessingWorker:
             backup_type: 备份类型，可以是 "failed"（失败）或 "processing"（处理中）
         """
         try:
-            # 获取当前时间戳（精确到分钟）
-            timestamp = datetime.now().strftime("%Y%m%d%H%M")
-            
             # 计算相对于监控文件夹的路径
             relative_path = None
             monitored_folder_name = "unknown_source"
             
-            for monitored_folder in self.monitoring_manager.monitored_folders:
-                if self.file_path.startswith(monitored_folder):
-                    # 获取相对路径
-                    relative_path = os.path.relpath(self.file_path, monitored_folder)
-                    # 获取监控文件夹的名称作为根目录
-                    monitored_folder_name = os.path.basename(monitored_folder.rstrip(os.sep))
+            abs_path = os.path.abspath(self.file_path)
+            file_key = os.path.normcase(abs_path)
+            for prefix, _, folder_name in self.monitoring_manager.monitored_prefixes:
+                if file_key.startswith(prefix):
+                    # 获取相对路径（normcase不改变长度，直接截去前缀，保留原始大小写）
+                    relative_path = abs_path[len(prefix):]
+                    # 监控文件夹的名称作为根目录
+                    monitored_folder_name = folder_name
                     break
             
             if relative_path is None:
@@ -300,7 +634,7 @@ class ProcessingWorker:
                 relative_path = os.path.basename(self.file_path)
             
             # 构建备份路径：配置的备份文件夹/日期时间/监控文件夹名/相对路径
-            backup_base = os.path.join(self.monitoring_manager.backup_folder, timestamp, monitored_folder_name)
+            backup_base = self.monitoring_manager.get_backup_base(monitored_folder_name)
             backup_path = os.path.join(backup_base, relative_path)
             
             # 如果文件已存在，添加序号
@@ -328,20 +662,29 @@ class MonitoringManager(QObject):
     stats_updated = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, backup_folder=None):
+    def __init__(self, backup_folder=None, skip_dirs=DEFAULT_SKIP_DIRS):
         super().__init__()
         
         # 监控状态
         self.is_running = False
         self.observers = []
+        self.event_handlers = []
+        # 上次定时扫描以来实时监控是否收到过文件事件
+        self.pending_changes = False
         
         # 配置
         self.config = {}
         self.advanced_config = {}  # 添加默认的advanced_config
         self.monitored_folders = []
+        # 监控文件夹的 (路径前缀, 路径, 名称)，开始监控时计算一次
+        self.monitored_prefixes = []
+        # 首次扫描时不进入的目录名，与手动扫描和定时扫描使用同一配置
+        self.skip_dirs = frozenset(skip_dirs)
         
         # 备份文件夹配置
         self.backup_folder = self.load_backup_config(backup_folder)
+        self._backup_prefix = (None, None)  # (备份文件夹, 路径前缀)，备份文件夹变化时重新计算
+        self._backup_bases = (None, None, {})  # (备份文件夹, 分钟时间戳, {监控文件夹名: 备份根目录})
         
         # 统计信息
         self.stats = {
@@ -352,17 +695,30 @@ class MonitoringManager(QObject):
         }
         self.stats_lock = Lock()
         
-        # 处理线程池
-        self.processing_threads = []
+        # 处理线程池（开始监控时创建），超出并发数的文件在线程池队列中等待
+        self.executor = None
         self.max_concurrent_threads = 3
         
+        # 网络文件夹的轮询间隔（秒），本地文件夹使用系统原生的文件变化通知
+        self.polling_interval = 30
+        self.processing_futures = set()  # 尚未完成的处理任务
+        self.processing_futures_lock = Lock()
+        
         # 已处理文件的哈希记录
-        self.processed_files = {}  # {file_path: {'hash': hash_value, 'timestamp': timestamp}}
+        # {file_path: {'hash': hash_value, 'mtime_ns': 修改时间, 'size': 文件大小, 'timestamp': timestamp}}
+        self.processed_files = {}
         self.processed_files_lock = Lock()
-        self.log_file_path = "aegis_processed_files.json"
+        # 记录以追加方式写入日志文件，每行一条；pending_records为尚未写入的行
+        self.pending_records = []
+        self.log_file_path = "aegis_processed_files.jsonl"
+        self.legacy_log_file_path = "aegis_processed_files.json"  # 旧版整体保存的记录文件
         
         # 支持的图像格式
         self.supported_formats = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp', '.heif', '.heic'}
+        self.image_suffixes = tuple(self.supported_formats)  # 供str.endswith使用
+        
+        # 图像清理器（初始化后不再修改内部状态，可在各处理线程间共享）
+        self.sanitizer = ImageSanitizer()
         
         # 加载已处理文件记录
         self.load_processed_files()
@@ -371,6 +727,11 @@ class MonitoringManager(QObject):
         self.stats_timer = QTimer()
         self.stats_timer.timeout.connect(self.emit_stats)
         self.stats_timer.start(1000)  # 每秒更新一次统计
+        
+        # 处理记录定时追加到日志文件，批量处理时合并为一次写入
+        self.save_timer = QTimer()
+        self.save_timer.timeout.connect(self.flush_processed_files)
+        self.save_timer.start(5000)
     
     def load_backup_config(self, backup_folder=None):
         """加载备份配置"""
@@ -402,9 +763,15 @@ class MonitoringManager(QObject):
         """开始监控"""
         try:
             self.monitored_folders = folders.copy()
+            self.monitored_prefixes = [
+                (_path_prefix(folder), folder, os.path.basename(folder.rstrip(os.sep)))
+                for folder in folders
+            ]
             self.config = config.copy()
             self.advanced_config = config.copy()  # 添加advanced_config属性
             self.is_running = True
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_threads)
             
             # 更新统计
             self.stats['folders'] = len(folders)
@@ -416,13 +783,22 @@ class MonitoringManager(QObject):
             # 为每个文件夹创建观察者
             for folder in folders:
                 if os.path.exists(folder):
-                    observer = Observer()
+                    polling = _needs_polling(folder)
+                    if polling:
+                        observer = PollingObserver(timeout=self.polling_interval)
+                    else:
+                        observer = Observer()
                     event_handler = ImageFileHandler(self)
                     observer.schedule(event_handler, folder, recursive=True)
                     observer.start()
                     self.observers.append(observer)
+                    self.event_handlers.append(event_handler)
                     
-                    self.log_message.emit(f"👁️ 开始监控文件夹: {folder}")
+                    if polling:
+                        self.log_message.emit(
+                            f"👁️ 开始监控文件夹（网络路径，每 {self.polling_interval} 秒轮询）: {folder}")
+                    else:
+                        self.log_message.emit(f"👁️ 开始监控文件夹: {folder}")
                 else:
                     self.log_message.emit(f"⚠️ 文件夹不存在: {folder}")
                     
@@ -438,16 +814,21 @@ class MonitoringManager(QObject):
                 continue
                 
             try:
-                for root, dirs, files in os.walk(folder):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        
-                        # 检查是否为图像文件
-                        if self.is_image_file(file_path):
-                            # 检查是否已处理过
-                            if not self.is_file_processed(file_path):
-                                self.log_message.emit(f"📁 发现新文件: {os.path.basename(file_path)}")
-                                self.submit_processing_task(file_path, "首次扫描")
+                # 一次性取得处理记录快照，没有记录的文件无需stat和计算哈希
+                processed = self.snapshot_processed_files()
+                for entry in walk_images(folder, self.is_image_name, self.skip_dirs, self.backup_folder):
+                    file_path = entry.path
+                    record = processed.get(record_key(file_path))
+                    if record is not None:
+                        try:
+                            # 复用DirEntry的stat结果（Windows上遍历时已取得，无需额外调用）
+                            if self.matches_record(file_path, record, entry.stat()):
+                                continue
+                        except OSError:
+                            continue  # 文件已被删除
+                    
+                    self.log_message.emit(f"📁 发现新文件: {entry.name}")
+                    self.submit_processing_task(file_path, "首次扫描")
                             
             except Exception as e:
                 self.log_message.emit(f"❌ 扫描文件夹失败 {folder}: {str(e)}")
@@ -464,8 +845,14 @@ class MonitoringManager(QObject):
                 
             self.observers.clear()
             
+            # 停止事件分发线程
+            for event_handler in self.event_handlers:
+                event_handler.stop()
+            self.event_handlers.clear()
+            
             # 等待处理线程完成
             self.wait_for_processing_threads()
+            self.flush_processed_files()
             
             self.log_message.emit("⏹️ 监控管理器已停止")
             
@@ -478,22 +865,13 @@ class MonitoringManager(QObject):
             return
             
         try:
-            # 清理已完成的线程
-            self.cleanup_finished_threads()
-            
-            # 检查并发限制
-            if len(self.processing_threads) >= self.max_concurrent_threads:
-                self.log_message.emit(f"⏳ 处理队列已满，等待处理: {os.path.basename(file_path)}")
-                return
-                
-            # 创建处理工作器
-            worker = ProcessingWorker(file_path, event_type, self)
-            
-            # 在新线程中执行
-            thread = threading.Thread(target=worker.process_file, daemon=True)
-            thread.start()
+            # 创建处理工作器，交给线程池执行
+            worker = ProcessingWorker(event_type, self)
+            future = self.executor.submit(worker.process, file_path)
             
-            self.processing_threads.append(thread)
+            with self.processing_futures_lock:
+                self.processing_futures.add(future)
+            future.add_done_callback(self._on_processing_done)
             self.increment_processed()
             
         except Exception as e:
@@ -503,22 +881,57 @@ class MonitoringManager(QObject):
         """提交处理任务（兼容性方法）"""
         self.queue_file_for_processing(file_path, event_type)
             
-    def cleanup_finished_threads(self):
-        """清理已完成的线程"""
-        self.processing_threads = [t for t in self.processing_threads if t.is_alive()]
+    def _on_processing_done(self, future):
+        """处理任务完成（或被取消）时从未完成集合中移除"""
+        with self.processing_futures_lock:
+            self.processing_futures.discard(future)
         
     def wait_for_processing_threads(self, timeout=30):
-        """等待处理线程完成"""
-        start_time = time.time()
+        """等待处理线程完成，尚未开始的任务直接取消"""
+        if self.executor is None:
+            return
         
-        while self.processing_threads and (time.time() - start_time) < timeout:
-            self.cleanup_finished_threads()
-            time.sleep(0.5)
-            
-        # 强制结束剩余线程（如果有的话）
-        if self.processing_threads:
-            self.log_message.emit(f"⚠️ {len(self.processing_threads)} 个处理线程未能及时完成")
+        with self.processing_futures_lock:
+            futures = list(self.processing_futures)
+        for future in futures:
+            future.cancel()
+        
+        _, not_done = wait(futures, timeout=timeout)
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        
+        if not_done:
+            self.log_message.emit(f"⚠️ {len(not_done)} 个处理线程未能及时完成")
             
+    def is_in_backup_folder(self, file_path):
+        """检查文件是否位于备份文件夹内（按规范化的路径前缀判断，不会误匹配同名片段）"""
+        backup_folder = self.backup_folder
+        if backup_folder is not self._backup_prefix[0]:
+            self._backup_prefix = (backup_folder, _path_prefix(backup_folder))
+        return os.path.normcase(os.path.abspath(file_path)).startswith(self._backup_prefix[1])
+    
+    def get_backup_base(self, folder_name):
+        """获取当前分钟的备份根目录（备份文件夹/日期时间/监控文件夹名），同一分钟内复用"""
+        backup_folder = self.backup_folder
+        timestamp = time.strftime("%Y%m%d%H%M")
+        cached_folder, cached_timestamp, bases = self._backup_bases
+        if cached_folder is not backup_folder or cached_timestamp != timestamp:
+            # 进入新的一分钟或备份文件夹变化时整体替换，旧条目随之丢弃
+            bases = {}
+            self._backup_bases = (backup_folder, timestamp, bases)
+        base = bases.get(folder_name)
+        if base is None:
+            base = bases[folder_name] = os.path.join(backup_folder, timestamp, folder_name)
+        return base
+    
+    def has_pending_changes(self):
+        """实时监控是否收到过尚未被定时扫描覆盖的文件事件"""
+        return self.pending_changes
+    
+    def clear_pending_changes(self):
+        """定时扫描开始时清除文件事件标记"""
+        self.pending_changes = False
+    
     def update_config(self, new_config: dict):
         """更新配置"""
         self.config = new_config.copy()
@@ -546,13 +959,29 @@ class MonitoringManager(QObject):
             self.stats_updated.emit(self.stats.copy())
     
     def calculate_file_hash(self, file_path):
-        """计算文件的MD5哈希值"""
+        """计算文件的MD5哈希值（已有处理记录都是MD5，更换算法会导致全部文件被重新处理）"""
         try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            with open(file_path, "rb", buffering=0) as f:
+                if _FADVISE_AVAILABLE:
+                    # 提示内核顺序预读
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                if _FILE_DIGEST_AVAILABLE:
+                    file_hash = hashlib.file_digest(f, "md5").hexdigest()
+                else:
+                    # 复用同一块缓冲区读取，不为每个分块分配新的bytes对象
+                    hash_md5 = hashlib.md5()
+                    buf = bytearray(_HASH_CHUNK_SIZE)
+                    view = memoryview(buf)
+                    while True:
+                        n = f.readinto(buf)
+                        if not n:
+                            break
+                        hash_md5.update(view[:n])
+                    file_hash = hash_md5.hexdigest()
+                if _FADVISE_AVAILABLE:
+                    # 只为计算哈希读取的数据不再需要，释放页缓存，避免挤出其他常用数据
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            return file_hash
         except Exception as e:
             self.log_message.emit(f"❌ 计算文件哈希失败: {file_path} - {str(e)}")
             return None
@@ -560,71 +989,223 @@ class MonitoringManager(QObject):
     def load_processed_files(self):
         """从文件加载已处理文件记录"""
         try:
-            if os.path.exists(self.log_file_path):
-                with open(self.log_file_path, 'r', encoding='utf-8') as f:
-                    self.processed_files = json.load(f)
-                self.log_message.emit(f"📖 已加载 {len(self.processed_files)} 条处理记录")
+            processed_files, line_count = self.read_processed_log()
+            with self.processed_files_lock:
+                self.processed_files = processed_files
+            
+            if line_count:
+                self.log_message.emit(f"📖 已加载 {len(processed_files)} 条处理记录")
+            elif processed_files:
+                self.log_message.emit(f"📖 已从旧版记录文件加载 {len(processed_files)} 条处理记录")
             else:
-                self.processed_files = {}
                 self.log_message.emit("📝 创建新的处理记录文件")
+            
+            # 从旧版文件迁移，或同一文件的重复记录过多时，重写为紧凑的日志
+            stale_lines = line_count - len(processed_files)
+            if (not line_count and processed_files) or stale_lines > max(len(processed_files), 1000):
+                self.save_processed_files()
         except Exception as e:
             self.log_message.emit(f"❌ 加载处理记录失败: {str(e)}")
             self.processed_files = {}
     
+    def read_processed_log(self):
+        """读取处理记录日志
+        
+        日志每行一条JSON记录，同一文件以最后一条为准；无法解析的行
+        （如写入中途崩溃留下的半行）直接跳过。日志不存在时读取旧版的整体JSON记录文件
+        
+        Returns:
+            (记录字典, 日志行数)，行数为0表示日志文件不存在或为空
+        """
+        loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+        processed_files = {}
+        line_count = 0
+        try:
+            with open(self.log_file_path, 'rb') as f:
+                for line in f:
+                    line_count += 1
+                    try:
+                        record = loads(line)
+                        processed_files[record_key(record.pop('path'))] = record
+                    except (ValueError, TypeError, KeyError, AttributeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        
+        if line_count:
+            return processed_files, line_count
+        
+        try:
+            with open(self.legacy_log_file_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return processed_files, 0
+        if data.strip():
+            processed_files = {record_key(path): record for path, record in loads(data).items()}
+        return processed_files, 0
+    
+    def reload_processed_files(self):
+        """重新从文件加载已处理文件记录（不输出日志）
+        
+        长期复用的管理器在每轮扫描前调用，以获得其他管理器写入的最新记录
+        """
+        # 先写入本管理器尚未保存的记录，避免被重新加载的内容丢弃
+        self.flush_processed_files()
+        try:
+            processed_files, _ = self.read_processed_log()
+            with self.processed_files_lock:
+                self.processed_files = processed_files
+        except Exception as e:
+            self.log_message.emit(f"❌ 加载处理记录失败: {str(e)}")
+    
     def save_processed_files(self):
-        """保存已处理文件记录到文件"""
+        """将全部记录重写为紧凑的日志文件（每个文件只保留最新一条）"""
+        pending = []
         try:
             with self.processed_files_lock:
-                with open(self.log_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.processed_files, f, ensure_ascii=False, indent=2)
+                data = b''.join(_dump_record(path, record)
+                                for path, record in self.processed_files.items())
+                pending = self.pending_records
+                self.pending_records = []
+            
+            # 先写临时文件再原子替换，保存中途崩溃不会损坏已有记录
+            temp_path = self.log_file_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.log_file_path)
         except Exception as e:
+            with self.processed_files_lock:
+                self.pending_records[:0] = pending
+            self.log_message.emit(f"❌ 保存处理记录失败: {str(e)}")
+    
+    def flush_processed_files(self):
+        """将新增记录追加到日志文件（由定时器调用，停止监控和扫描结束时也会调用）"""
+        with self.processed_files_lock:
+            if not self.pending_records:
+                return
+            pending = self.pending_records
+            self.pending_records = []
+        
+        try:
+            with open(self.log_file_path, 'a+b') as f:
+                # 上次写入中途崩溃留下不完整的行时，先补换行，避免新记录接在半行后面
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        pending.insert(0, b'\n')
+                f.write(b''.join(pending))
+        except Exception as e:
+            with self.processed_files_lock:
+                self.pending_records[:0] = pending
             self.log_message.emit(f"❌ 保存处理记录失败: {str(e)}")
     
     def is_file_processed(self, file_path):
-        """检查文件是否已经处理过（基于哈希值）"""
+        """检查文件是否已经处理过（修改时间和大小未变时直接认定，否则比较哈希值）"""
         try:
-            if not os.path.exists(file_path):
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
                 return True  # 文件不存在，认为已处理
             
-            current_hash = self.calculate_file_hash(file_path)
-            if not current_hash:
-                return False  # 无法计算哈希，需要处理
-            
+            key = record_key(file_path)
             with self.processed_files_lock:
-                if file_path in self.processed_files:
-                    stored_hash = self.processed_files[file_path].get('hash')
-                    return stored_hash == current_hash
-                return False  # 文件未记录，需要处理
+                record = self.processed_files.get(key)
+                if record is None:
+                    return False  # 文件未记录，需要处理
+                record = (record.get('hash'), record.get('mtime_ns'), record.get('size'))
+            
+            return self.matches_record(file_path, record, st)
         except Exception as e:
             self.log_message.emit(f"❌ 检查文件处理状态失败: {file_path} - {str(e)}")
             return False
     
+    def has_unchanged_record(self, file_path):
+        """文件有处理记录且修改时间和大小与记录一致（只stat，不计算哈希）"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        with self.processed_files_lock:
+            record = self.processed_files.get(record_key(file_path))
+            return (record is not None and record.get('mtime_ns') == st.st_mtime_ns
+                    and record.get('size') == st.st_size)
+    
+    def matches_record(self, file_path, record, st=None):
+        """检查文件当前内容是否仍与处理记录一致
+        
+        先比较修改时间和大小，一致时不读取文件；大小变化时直接认定已修改；
+        仅修改时间变化或旧记录中没有这些信息时再比较哈希值
+        
+        Args:
+            file_path: 文件路径
+            record: snapshot_processed_files 返回的 (hash, mtime_ns, size)
+            st: 已取得的 os.stat 结果，为None时重新获取
+        """
+        stored_hash, mtime_ns, size = record
+        if st is None:
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                return True  # 文件不存在，认为已处理
+        
+        if mtime_ns == st.st_mtime_ns and size == st.st_size:
+            return True
+        
+        # 大小不同时内容必然不同，无需读取文件；只有大小相同而修改时间变化时才比较哈希
+        if size is not None and size != st.st_size:
+            return False
+        
+        if self.calculate_file_hash(file_path) != stored_hash:
+            return False
+        
+        # 内容未变（如仅修改时间变化或旧记录），补全记录中的修改时间和大小，下次不必再计算哈希
+        key = record_key(file_path)
+        with self.processed_files_lock:
+            current = self.processed_files.get(key)
+            if current is not None and current.get('hash') == stored_hash:
+                current['mtime_ns'] = st.st_mtime_ns
+                current['size'] = st.st_size
+                self.pending_records.append(_dump_record(key, current))
+        return True
+    
+    def snapshot_processed_files(self):
+        """返回已处理文件记录的快照 {record_key(file_path): (hash, mtime_ns, size)}，供批量扫描一次性查询"""
+        with self.processed_files_lock:
+            return {path: (record.get('hash'), record.get('mtime_ns'), record.get('size'))
+                    for path, record in self.processed_files.items()}
+    
     def mark_file_processed(self, file_path):
         """标记文件为已处理"""
         try:
             file_hash = self.calculate_file_hash(file_path)
             if file_hash:
+                st = os.stat(file_path)
+                record = {
+                    'hash': file_hash,
+                    'mtime_ns': st.st_mtime_ns,
+                    'size': st.st_size,
+                    'timestamp': datetime.now().isoformat()
+                }
+                # 哈希、stat和序列化都在锁外完成，锁内只更新字典
+                key = record_key(file_path)
+                line = _dump_record(key, record)
                 with self.processed_files_lock:
-                    self.processed_files[file_path] = {
-                        'hash': file_hash,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                self.save_processed_files()
+                    self.processed_files[key] = record
+                    self.pending_records.append(line)
         except Exception as e:
             self.log_message.emit(f"❌ 标记文件处理状态失败: {file_path} - {str(e)}")
     
     def is_image_file(self, file_path):
         """检查文件是否为支持的图像格式"""
-        if not Path(file_path).suffix.lower() in self.supported_formats:
+        return self.is_image_name(os.path.basename(file_path))
+    
+    def is_image_name(self, filename):
+        """按文件名检查是否为支持的图像格式（纯字符串判断，不访问文件系统）"""
+        if not filename.lower().endswith(self.image_suffixes):
             return False
-            
-        # 进一步检查文件名，排除备份文件
-        filename = Path(file_path).name
         
         # 排除带时间戳的文件（通常是备份文件）
-        import re
-        timestamp_pattern = r'_\d{8}_\d{6}'
-        if re.search(timestamp_pattern, filename):
+        if _TIMESTAMP_PATTERN.search(filename):
             return False
             
         # 排除失败标记的文件
@@ -640,6 +1221,6 @@ class MonitoringManager(QObject):
                 'is_running': self.is_running,
                 'monitored_folders': self.monitored_folders.copy(),
                 'active_observers': len(self.observers),
-                'processing_threads': len(self.processing_threads),
+                'processing_threads': len(self.processing_futures),
                 'stats': self.stats.copy()
             }
\ No newline at end of file
@@ -5,11 +5,18 @@
 """
 
 import os
+import re
+import functools
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from PIL import Image
 from PIL.ExifTags import TAGS
 
+import hsv_kernels
+
 # 导入HEIF支持
 try:
     from pillow_heif import register_heif_opener
@@ -18,6 +25,126 @@ try:
 except ImportError:
     HEIF_AVAILABLE = False
 
+# PNG文件签名，以及无损删除元数据时保留的块（图像数据和显示所需的调色板、透明度、色彩空间）
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_KEEP_CHUNKS = frozenset({b'IHDR', b'PLTE', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'sBIT', b'IDAT', b'IEND'})
+# JPEG扫描数据中的真实标记：跳过字节填充FF00、复位标记FFD0-FFD7和填充字节FFFF
+_JPEG_MARKER_PATTERN = re.compile(rb'\xff[^\x00\xd0-\xd7\xff]')
+
+# 修复（inpaint）半径
+_INPAINT_RADIUS = 3
+# 连通区域超过该数量时整幅修复，避免逐块调用的Python开销
+_MAX_INPAINT_TILES = 512
+
+
+@functools.lru_cache(maxsize=16)
+def _get_morph_kernel(iterations):
+    """获取与3x3矩形核重复iterations次等价的矩形结构元素"""
+    size = 2 * iterations + 1
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (size, size))
+
+
+def _get_hue_ranges(hue_center, hue_tolerance):
+    """色调是环形的（0-179），范围越过0或179时回绕，拆成两段分别匹配"""
+    hue_lo = hue_center - hue_tolerance
+    hue_hi = hue_center + hue_tolerance
+    
+    if 0 <= hue_lo and hue_hi <= 179:
+        return [(hue_lo, hue_hi)]
+    return [(0, hue_hi % 180), (hue_lo % 180, 179)]
+
+
+@functools.lru_cache(maxsize=16)
+def _get_hsv_bounds(hue_center, hue_tolerance, min_saturation, min_value):
+    """获取inRange使用的HSV上下限数组，同一组参数只构造一次
+    
+    Returns:
+        ((下限, 上限), ...)，色调范围回绕时为两段
+    """
+    return tuple((np.array([range_lo, min_saturation, min_value], np.uint8),
+                  np.array([range_hi, 255, 255], np.uint8))
+                 for range_lo, range_hi in _get_hue_ranges(hue_center, hue_tolerance))
+
+
+@functools.lru_cache(maxsize=16)
+def _get_hsv_luts(hue_center, hue_tolerance, min_saturation, min_value):
+    """获取Numba查找表内核使用的HSV查找表（与 _get_hsv_bounds 的范围等价）"""
+    hue_ranges = _get_hue_ranges(hue_center, hue_tolerance)
+    if len(hue_ranges) == 1:
+        hue_lo, hue_hi = hue_ranges[0]
+    else:
+        # [0, hue_hi] 和 [hue_lo, 179] 两段：hue_lo > hue_hi 时查找表按回绕处理，
+        # 两段重叠（容差过大）时覆盖全部色调
+        (_, hue_hi), (hue_lo, _) = hue_ranges
+        if hue_lo <= hue_hi:
+            hue_lo, hue_hi = 0, 179
+    return hsv_kernels.build_hsv_luts(hue_lo, hue_hi, min_saturation, min_value)
+
+
+def _flatten_alpha(pil_image):
+    """将带透明度的图像合成到白色背景上（用于不支持透明度的格式），其他图像原样返回"""
+    if pil_image.mode not in ('RGBA', 'LA'):
+        return pil_image
+    background = Image.new('RGB', pil_image.size, (255, 255, 255))
+    if pil_image.mode == 'RGBA':
+        background.paste(pil_image, mask=pil_image.split()[-1])
+    else:
+        background.paste(pil_image)
+    return background
+
+
+def _save_jpeg(pil_image, output_path):
+    # JPEG不支持透明度，转换为RGB
+    _flatten_alpha(pil_image).save(output_path, 'JPEG', quality=95, optimize=True)
+
+
+def _save_png(pil_image, output_path):
+    pil_image.save(output_path, 'PNG', optimize=True)
+
+
+def _save_bmp(pil_image, output_path):
+    if pil_image.mode in ('RGBA', 'LA'):
+        pil_image = pil_image.convert('RGB')
+    pil_image.save(output_path, 'BMP')
+
+
+def _save_tiff(pil_image, output_path):
+    pil_image.save(output_path, 'TIFF')
+
+
+def _save_webp(pil_image, output_path):
+    # WebP支持透明度和高质量压缩
+    pil_image.save(output_path, 'WEBP', quality=95, method=6)
+
+
+def _save_heif(pil_image, output_path):
+    # HEIF/HEIC格式支持（需要pillow-heif），HEIF不支持透明度，转换为RGB
+    pil_image = _flatten_alpha(pil_image)
+    if HEIF_AVAILABLE:
+        pil_image.save(output_path, 'HEIF', quality=95)
+    else:
+        # 如果HEIF不可用，保存为JPEG
+        jpeg_path = output_path.rsplit('.', 1)[0] + '.jpg'
+        pil_image.save(jpeg_path, 'JPEG', quality=95, optimize=True)
+
+
+def _save_default(pil_image, output_path):
+    pil_image.save(output_path, 'PNG')
+
+
+# 按扩展名选择保存函数
+_SAVERS = {
+    '.jpg': _save_jpeg,
+    '.jpeg': _save_jpeg,
+    '.png': _save_png,
+    '.bmp': _save_bmp,
+    '.tiff': _save_tiff,
+    '.tif': _save_tiff,
+    '.webp': _save_webp,
+    '.heif': _save_heif,
+    '.heic': _save_heif,
+}
+
 
 class ImageSanitizer:
     """图像清理器 - 执行元数据清理和高级清理"""
@@ -30,6 +157,10 @@ class ImageSanitizer:
         if HEIF_AVAILABLE:
             self.supported_formats.update({'.heif', '.heic'})
         
+        # 各线程的OpenCV工作缓冲区（批量处理同尺寸图像时复用，见 _get_work_buffers）
+        self._work_buffers = threading.local()
+        self.max_buffer_sizes = 2  # 每个线程最多缓存几种尺寸的缓冲区
+        
     def clean_image(self, input_path: str, output_path: str = None, advanced_config: dict = None) -> bool:
         """
         清理图像文件
@@ -42,6 +173,7 @@ class ImageSanitizer:
         Returns:
             bool: 处理是否成功
         """
+        temp_path = None
         try:
             # 验证输入文件
             if not os.path.exists(input_path):
@@ -62,24 +194,33 @@ class ImageSanitizer:
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # 创建临时文件路径
-            temp_path = input_path + ".aegis_temp"
-            
-            # 第一步：使用Pillow进行元数据清理
-            cleaned_image = self._strip_metadata_with_pillow(input_path)
+            # 临时文件放在输出文件旁边，保证最后的替换是同一目录内的原子操作
+            temp_path = output_path + ".aegis_temp"
             
-            # 第二步：检查是否启用高级清理
-            if advanced_config and advanced_config.get('enabled', False):
-                cleaned_image = self._remove_tracking_dots(cleaned_image, advanced_config)
+            # 未启用高级清理且选择了无损模式时，JPEG和PNG直接删除元数据段，不解码和重新编码像素
+            ext = os.path.splitext(output_path)[1].lower()
+            stripped = False
+            if (advanced_config and not advanced_config.get('enabled', False)
+                    and advanced_config.get('lossless_strip', False)):
+                if ext in ('.jpg', '.jpeg'):
+                    stripped = self._strip_jpeg_metadata(input_path, temp_path)
+                elif ext == '.png':
+                    stripped = self._strip_png_metadata(input_path, temp_path)
             
-            # 保存到临时文件
-            self._save_cleaned_image(cleaned_image, temp_path)
+            if not stripped:
+                # 第一步：使用Pillow进行元数据清理
+                cleaned_image = self._strip_metadata_with_pillow(input_path)
+                
+                # 第二步：检查是否启用高级清理
+                if advanced_config and advanced_config.get('enabled', False):
+                    cleaned_image = self._remove_tracking_dots(cleaned_image, advanced_config)
+                
+                # 保存到临时文件
+                # 临时文件的扩展名是.aegis_temp，保存格式按最终输出路径的扩展名确定
+                self._save_cleaned_image(cleaned_image, temp_path, ext)
             
-            # 替换原文件
-            if temp_path != output_path:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-                os.rename(temp_path, output_path)
+            # 原子替换目标文件（目标已存在时直接覆盖，不会出现目标被删除而新文件未就位的间隙）
+            os.replace(temp_path, output_path)
             
             print(f"✅ 图像清理完成: {os.path.basename(output_path)}")
             return True
@@ -87,19 +228,161 @@ class ImageSanitizer:
         except Exception as e:
             print(f"❌ 图像清理失败: {str(e)}")
             # 清理临时文件
-            temp_file = input_path + ".aegis_temp"
-            if os.path.exists(temp_file):
+            if temp_path and os.path.exists(temp_path):
                 try:
-                    os.remove(temp_file)
+                    os.remove(temp_path)
                 except:
                     pass
             return False
             
+    def clean_batch(self, jobs: list, workers: int = None) -> list:
+        """
+        并行清理多张图像
+        
+        解码、OpenCV处理和编码在C层进行时会释放GIL，多线程即可并行；
+        批处理期间将OpenCV内部线程数设为1，避免与批处理线程争抢CPU，结束后恢复。
+        只清理单张图像时直接调用 clean_image，保留OpenCV默认的多线程
+        
+        Args:
+            jobs: [(输入路径, 输出路径, 高级配置), ...]，输出路径为None时直接替换原文件
+            workers: 并行线程数，默认为CPU核数
+            
+        Returns:
+            与jobs一一对应的处理结果列表
+        """
+        if not jobs:
+            return []
+        
+        previous_threads = cv2.getNumThreads()
+        cv2.setNumThreads(1)
+        try:
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as executor:
+                return list(executor.map(lambda job: self.clean_image(*job), jobs))
+        finally:
+            cv2.setNumThreads(previous_threads)
+            
     def _is_supported_format(self, file_path: str) -> bool:
         """检查是否为支持的图像格式"""
         _, ext = os.path.splitext(file_path.lower())
         return ext in self.supported_formats
         
+    def _strip_jpeg_metadata(self, input_path: str, output_path: str) -> bool:
+        """
+        不解码像素，逐段复制JPEG并删除元数据（类似 jpegtran -copy none）
+        
+        删除EXIF、XMP、ICC、IPTC等APPn段和注释段；复制到第一个EOI为止，
+        之后附加的数据（MPF多图、动态照片等，其中可能带有完整EXIF）全部丢弃。
+        保留解码所需的段，JFIF段去掉其中的缩略图，Adobe段保留（CMYK/YCCK颜色转换需要）
+        
+        Args:
+            input_path: 输入JPEG路径
+            output_path: 输出路径
+            
+        Returns:
+            bool: 是否成功；文件结构无法识别时返回False，调用方应回退到解码重新编码
+        """
+        with open(input_path, 'rb') as f:
+            data = f.read()
+        if data[:2] != b'\xff\xd8':
+            return False
+        
+        parts = [b'\xff\xd8']
+        pos = 2
+        size = len(data)
+        while True:
+            if pos + 2 > size or data[pos] != 0xFF:
+                return False
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                # 段之间的填充字节
+                pos += 1
+                continue
+            if marker == 0xD9:
+                # 主图像结束，后面的附加数据丢弃
+                parts.append(b'\xff\xd9')
+                break
+            if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                # 没有长度字段的独立标记
+                parts.append(data[pos:pos + 2])
+                pos += 2
+                continue
+            
+            if pos + 4 > size:
+                return False
+            length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+            end = pos + 2 + length
+            if length < 2 or end > size:
+                return False
+            
+            if marker == 0xDA:
+                # 扫描段（SOS）后是熵编码数据，找到下一个真实标记为止原样保留；
+                # 渐进式JPEG之后还会有DHT、SOS等段，继续按段解析
+                match = _JPEG_MARKER_PATTERN.search(data, end)
+                if match is None:
+                    return False
+                parts.append(data[pos:match.start()])
+                pos = match.start()
+                continue
+            
+            payload = data[pos + 4:end]
+            if marker == 0xE0:
+                if payload.startswith(b'JFIF\x00') and len(payload) >= 14:
+                    # 只保留JFIF头（版本、密度），缩略图尺寸置0并去掉缩略图数据
+                    parts.append(b'\xff\xe0\x00\x10' + payload[:12] + b'\x00\x00')
+            elif marker == 0xEE:
+                if payload.startswith(b'Adobe'):
+                    parts.append(data[pos:end])
+            elif 0xE1 <= marker <= 0xEF or marker == 0xFE:
+                pass
+            else:
+                parts.append(data[pos:end])
+            pos = end
+        
+        with open(output_path, 'wb') as f:
+            f.writelines(parts)
+        return True
+        
+    def _strip_png_metadata(self, input_path: str, output_path: str) -> bool:
+        """
+        不解码像素，逐块复制PNG并删除元数据
+        
+        只保留图像数据和正确显示所需的块（_PNG_KEEP_CHUNKS），删除文本、EXIF、ICC、时间等块
+        以及IEND之后的附加数据
+        
+        Args:
+            input_path: 输入PNG路径
+            output_path: 输出路径
+            
+        Returns:
+            bool: 是否成功；文件结构无法识别时返回False，调用方应回退到解码重新编码
+        """
+        with open(input_path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(_PNG_SIGNATURE):
+            return False
+        
+        parts = [_PNG_SIGNATURE]
+        pos = len(_PNG_SIGNATURE)
+        size = len(data)
+        while True:
+            if pos + 8 > size:
+                return False
+            length = int.from_bytes(data[pos:pos + 4], 'big')
+            chunk_type = data[pos + 4:pos + 8]
+            # 块结构：长度(4) + 类型(4) + 数据 + CRC(4)
+            end = pos + 12 + length
+            if end > size:
+                return False
+            if chunk_type in _PNG_KEEP_CHUNKS:
+                parts.append(data[pos:end])
+            if chunk_type == b'IEND':
+                break
+            pos = end
+        
+        with open(output_path, 'wb') as f:
+            f.writelines(parts)
+        return True
+        
     def _strip_metadata_with_pillow(self, input_path: str) -> Image.Image:
         """
         使用Pillow清理图像元数据
@@ -112,21 +395,30 @@ class ImageSanitizer:
         """
         try:
             # 打开图像
-            with Image.open(input_path) as img:
-                # 获取原始图像数据（不包含EXIF等元数据）
-                data = list(img.getdata())
-                
-                # 创建新的图像对象（不包含元数据）
-                clean_img = Image.new(img.mode, img.size)
-                clean_img.putdata(data)
+            # 由我们自己打开文件：文件关闭后已解码的图像仍可使用
+            # （用Image.open(路径)的with块退出后图像会被一并关闭）
+            with open(input_path, 'rb') as f:
+                img = Image.open(f)
                 
                 # 如果原图有透明度，保持透明度
                 if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                    clean_img = clean_img.convert('RGBA')
+                    target_mode = 'RGBA'
+                else:
+                    target_mode = 'RGB'
+                
+                if img.mode == target_mode and img.format != 'TIFF':
+                    # 模式已符合时直接使用解码得到的图像，不再复制整幅像素；
+                    # TIFF除外：保存TIFF图像对象时Pillow会带上原文件的XMP、IPTC等标签
+                    img.load()
+                    clean_img = img
                 else:
-                    clean_img = clean_img.convert('RGB')
-                    
-                return clean_img
+                    # 在C层转换为目标模式得到新图像
+                    clean_img = img.convert(target_mode)
+            
+            # 原图和convert的结果都带有原图的info（EXIF、ICC、XMP等），清空后只剩像素数据
+            clean_img.info = {}
+                
+            return clean_img
                 
         except Exception as e:
             raise Exception(f"Pillow元数据清理失败: {str(e)}")
@@ -143,24 +435,24 @@ class ImageSanitizer:
             清理后的PIL图像对象
         """
         try:
-            # 转换PIL图像为OpenCV格式
+            # 直接在RGB顺序的数组上检测和修复（修复与通道顺序无关，只有转HSV时需要区分），
+            # 省去RGB↔BGR的往返转换
+            arr = np.asarray(pil_image)
             if pil_image.mode == 'RGBA':
-                cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGBA2BGR)
+                rgb = cv2.cvtColor(arr, cv2.COLOR_RGBA2RGB)
             else:
-                cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+                rgb = arr
                 
             # 应用OpenCV清理算法
-            cleaned_cv = self._apply_opencv_cleaning(cv_image, advanced_config)
+            cleaned_rgb = self._apply_opencv_cleaning(rgb, advanced_config, is_rgb=True)
             
             # 转换回PIL格式
             if pil_image.mode == 'RGBA':
-                # 保持透明度通道
-                cleaned_rgb = cv2.cvtColor(cleaned_cv, cv2.COLOR_BGR2RGB)
-                alpha_channel = np.array(pil_image)[:, :, 3]
-                cleaned_rgba = np.dstack((cleaned_rgb, alpha_channel))
+                # 保持透明度通道：一次分配RGBA数组，再写回原透明度
+                cleaned_rgba = cv2.cvtColor(cleaned_rgb, cv2.COLOR_RGB2RGBA)
+                cleaned_rgba[:, :, 3] = arr[:, :, 3]
                 return Image.fromarray(cleaned_rgba, 'RGBA')
             else:
-                cleaned_rgb = cv2.cvtColor(cleaned_cv, cv2.COLOR_BGR2RGB)
                 return Image.fromarray(cleaned_rgb, 'RGB')
                 
         except Exception as e:
@@ -168,19 +460,24 @@ class ImageSanitizer:
             # 如果OpenCV清理失败，返回原图像
             return pil_image
             
-    def _apply_opencv_cleaning(self, cv_image: np.ndarray, config: dict) -> np.ndarray:
+    def _apply_opencv_cleaning(self, cv_image: np.ndarray, config: dict, is_rgb: bool = False) -> np.ndarray:
         """
         应用OpenCV清理算法
         
         Args:
             cv_image: OpenCV图像数组
             config: 配置参数
+            is_rgb: 图像是否为RGB通道顺序（默认为OpenCV的BGR顺序），结果保持相同顺序
             
         Returns:
             清理后的OpenCV图像数组
         """
+        # HSV图像和两块掩码缓冲区按尺寸复用，各步骤通过dst参数写入，
+        # 需要新结果时在两块掩码之间交替，不再为每一步分配整幅图像
+        hsv, mask, tmp = self._get_work_buffers(cv_image.shape[:2])
+        
         # 转换为HSV色彩空间
-        hsv = cv2.cvtColor(cv_image, cv2.COLOR_BGR2HSV)
+        cv2.cvtColor(cv_image, cv2.COLOR_RGB2HSV if is_rgb else cv2.COLOR_BGR2HSV, dst=hsv)
         
         # 获取配置参数
         hue_center = config.get('hue_center', 120)
@@ -190,41 +487,77 @@ class ImageSanitizer:
         median_blur_kernel = config.get('median_blur_kernel', 5)
         morphology_iterations = config.get('morphology_iterations', 2)
         
-        # 创建HSV颜色范围
-        lower_hsv = np.array([
-            max(0, hue_center - hue_tolerance),
-            min_saturation,
-            min_value
-        ])
-        upper_hsv = np.array([
-            min(179, hue_center + hue_tolerance),
-            255,
-            255
-        ])
-        
-        # 创建颜色掩码
-        mask = cv2.inRange(hsv, lower_hsv, upper_hsv)
+        # 创建颜色掩码（Numba可用时使用查找表内核，色调回绕时也只需一次遍历；否则使用inRange）
+        if hsv_kernels.NUMBA_AVAILABLE:
+            luts = _get_hsv_luts(hue_center, hue_tolerance, min_saturation, min_value)
+            hsv_kernels.hsv_mask_lut(hsv, luts, mask)
+        else:
+            for index, (lower_hsv, upper_hsv) in enumerate(
+                    _get_hsv_bounds(hue_center, hue_tolerance, min_saturation, min_value)):
+                if index == 0:
+                    cv2.inRange(hsv, lower_hsv, upper_hsv, dst=mask)
+                else:
+                    cv2.inRange(hsv, lower_hsv, upper_hsv, dst=tmp)
+                    cv2.bitwise_or(mask, tmp, dst=mask)
+        
+        # 没有任何像素命中目标颜色时，滤波和形态学操作后掩码仍为空，直接返回原图
+        if cv2.countNonZero(mask) == 0:
+            return cv_image
         
         # 应用中值滤波去噪
         if median_blur_kernel > 1:
             # 确保核大小为奇数
             if median_blur_kernel % 2 == 0:
                 median_blur_kernel += 1
-            mask = cv2.medianBlur(mask, median_blur_kernel)
+            cv2.medianBlur(mask, median_blur_kernel, dst=tmp)
+            mask, tmp = tmp, mask
             
         # 形态学操作清理掩码
         if morphology_iterations > 0:
-            kernel = np.ones((3, 3), np.uint8)
-            # 闭运算：填充小洞
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=morphology_iterations)
-            # 开运算：移除小噪点
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=morphology_iterations)
+            # 3x3矩形核重复N次等价于边长2N+1的矩形核执行一次，每个基本操作只需一遍
+            kernel = _get_morph_kernel(morphology_iterations)
+            # 闭运算：填充小洞（先膨胀后腐蚀）
+            cv2.dilate(mask, kernel, dst=tmp)
+            cv2.erode(tmp, kernel, dst=mask)
+            # 开运算：移除小噪点（先腐蚀后膨胀）
+            cv2.erode(mask, kernel, dst=tmp)
+            cv2.dilate(tmp, kernel, dst=mask)
             
         # 修复检测到的区域
         result = self._inpaint_detected_regions(cv_image, mask)
         
         return result
         
+    def _get_work_buffers(self, size: tuple) -> tuple:
+        """
+        获取当前线程指定尺寸的工作缓冲区，同尺寸图像连续处理时不再重新分配
+        
+        缓冲区只在 _apply_opencv_cleaning 内部使用，不会随结果返回；
+        每个线程按最近使用保留 max_buffer_sizes 种尺寸，避免尺寸各异时占用过多内存
+        
+        Args:
+            size: 图像尺寸 (高, 宽)
+            
+        Returns:
+            (HSV图像, 掩码, 备用掩码)
+        """
+        cache = getattr(self._work_buffers, 'cache', None)
+        if cache is None:
+            cache = self._work_buffers.cache = collections.OrderedDict()
+        
+        buffers = cache.get(size)
+        if buffers is None:
+            height, width = size
+            buffers = (np.empty((height, width, 3), np.uint8),
+                       np.empty((height, width), np.uint8),
+                       np.empty((height, width), np.uint8))
+            cache[size] = buffers
+            while len(cache) > self.max_buffer_sizes:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(size)
+        return buffers
+        
     def _inpaint_detected_regions(self, image: np.ndarray, mask: np.ndarray) -> np.ndarray:
         """
         修复检测到的区域
@@ -239,7 +572,19 @@ class ImageSanitizer:
         try:
             # 尝试使用OpenCV的inpainting功能
             if hasattr(cv2, 'INPAINT_TELEA'):
-                return cv2.inpaint(image, mask, 3, cv2.INPAINT_TELEA)
+                if cv2.countNonZero(mask) == 0:
+                    # 掩码为空（图像中没有目标颜色），无需修复
+                    return image
+                
+                # 区域较少时只修复每个区域周围的小块，区域过多或覆盖面积较大时整幅修复
+                # （外轮廓对应8连通区域，比连通区域标记快一个数量级）
+                contours = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+                pad = _INPAINT_RADIUS + 3
+                boxes = [cv2.boundingRect(contour) for contour in contours]
+                tiles_area = sum((w + 2 * pad) * (h + 2 * pad) for _, _, w, h in boxes)
+                if len(contours) > _MAX_INPAINT_TILES or tiles_area * 2 > mask.size:
+                    return cv2.inpaint(image, mask, _INPAINT_RADIUS, cv2.INPAINT_TELEA)
+                return self._inpaint_tiles(image, mask, contours, boxes, pad)
             else:
                 # 如果没有inpaint功能，使用高斯模糊替代
                 return self._gaussian_blur_replacement(image, mask)
@@ -247,7 +592,36 @@ class ImageSanitizer:
         except Exception:
             # 备用方案：高斯模糊
             return self._gaussian_blur_replacement(image, mask)
+    
+    def _inpaint_tiles(self, image: np.ndarray, mask: np.ndarray, contours: list,
+                       boxes: list, pad: int) -> np.ndarray:
+        """
+        逐个区域修复：裁出区域外扩pad像素的小块修复后，只写回该区域的像素
+        
+        Args:
+            image: 原始图像
+            mask: 检测掩码
+            contours: 各区域的外轮廓
+            boxes: 各区域的外接矩形 (x, y, w, h)，与contours一一对应
+            pad: 小块相对外接矩形外扩的像素数（需大于修复半径）
+            
+        Returns:
+            修复后的图像
+        """
+        height, width = mask.shape
+        result = image.copy()
+        for contour, (x, y, w, h) in zip(contours, boxes):
+            x0, y0 = max(x - pad, 0), max(y - pad, 0)
+            x1, y1 = min(x + w + pad, width), min(y + h + pad, height)
+            patch = cv2.inpaint(image[y0:y1, x0:x1], mask[y0:y1, x0:x1], _INPAINT_RADIUS, cv2.INPAINT_TELEA)
             
+            # 小块中可能包含相邻区域的一部分，只写回本区域（轮廓内的掩码像素）
+            region = np.zeros((h, w), np.uint8)
+            cv2.drawContours(region, [contour], -1, 255, thickness=cv2.FILLED, offset=(-x, -y))
+            region = (region > 0) & (mask[y:y + h, x:x + w] > 0)
+            result[y:y + h, x:x + w][region] = patch[y - y0:y - y0 + h, x - x0:x - x0 + w][region]
+        return result
+        
     def _gaussian_blur_replacement(self, image: np.ndarray, mask: np.ndarray) -> np.ndarray:
         """
         使用高斯模糊作为inpainting的替代方案
@@ -264,113 +638,57 @@ class ImageSanitizer:
         # 创建模糊版本
         blurred = cv2.GaussianBlur(image, (15, 15), 0)
         
-        # 在掩码区域应用模糊
-        result[mask > 0] = blurred[mask > 0]
+        # 在掩码区域应用模糊（copyTo一次完成掩码写入，不生成布尔索引数组）
+        cv2.copyTo(blurred, mask, result)
         
         return result
         
-    def _save_cleaned_image(self, pil_image: Image.Image, output_path: str):
+    def _save_cleaned_image(self, pil_image: Image.Image, output_path: str, ext: str = None):
         """
-        保存清理后的图像
+        保存清理后的图像（输出目录由调用方保证存在）
         
         Args:
             pil_image: 清理后的PIL图像
             output_path: 输出路径
+            ext: 决定保存格式的扩展名（如 '.jpg'），为None时取输出路径的扩展名
         """
         try:
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_path)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-                
-            # 根据文件扩展名确定保存格式
-            _, ext = os.path.splitext(output_path.lower())
-            
-            if ext in ['.jpg', '.jpeg']:
-                # JPEG不支持透明度，转换为RGB
-                if pil_image.mode in ('RGBA', 'LA'):
-                    # 创建白色背景
-                    background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                    if pil_image.mode == 'RGBA':
-                        background.paste(pil_image, mask=pil_image.split()[-1])
-                    else:
-                        background.paste(pil_image)
-                    pil_image = background
-                pil_image.save(output_path, 'JPEG', quality=95, optimize=True)
-                
-            elif ext == '.png':
-                pil_image.save(output_path, 'PNG', optimize=True)
-                
-            elif ext in ['.bmp']:
-                if pil_image.mode in ('RGBA', 'LA'):
-                    pil_image = pil_image.convert('RGB')
-                pil_image.save(output_path, 'BMP')
-                
-            elif ext in ['.tiff', '.tif']:
-                pil_image.save(output_path, 'TIFF')
-                
-            elif ext == '.webp':
-                # WebP支持透明度和高质量压缩
-                pil_image.save(output_path, 'WEBP', quality=95, method=6)
-                
-            elif ext in ['.heif', '.heic']:
-                # HEIF/HEIC格式支持（需要pillow-heif）
-                if HEIF_AVAILABLE:
-                    # HEIF不支持透明度，转换为RGB
-                    if pil_image.mode in ('RGBA', 'LA'):
-                        background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                        if pil_image.mode == 'RGBA':
-                            background.paste(pil_image, mask=pil_image.split()[-1])
-                        else:
-                            background.paste(pil_image)
-                        pil_image = background
-                    pil_image.save(output_path, 'HEIF', quality=95)
-                else:
-                    # 如果HEIF不可用，保存为JPEG
-                    if pil_image.mode in ('RGBA', 'LA'):
-                        background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                        if pil_image.mode == 'RGBA':
-                            background.paste(pil_image, mask=pil_image.split()[-1])
-                        else:
-                            background.paste(pil_image)
-                        pil_image = background
-                    jpeg_path = output_path.rsplit('.', 1)[0] + '.jpg'
-                    pil_image.save(jpeg_path, 'JPEG', quality=95, optimize=True)
-                    
-            else:
-                # 默认保存为PNG
-                pil_image.save(output_path, 'PNG')
+            # 根据文件扩展名确定保存格式，未知格式默认保存为PNG
+            if ext is None:
+                ext = os.path.splitext(output_path)[1]
+            saver = _SAVERS.get(ext.lower(), _save_default)
+            saver(pil_image, output_path)
                 
         except Exception as e:
             raise Exception(f"保存图像失败: {str(e)}")
             
-    def get_image_info(self, image_path: str) -> dict:
+    def get_image_info(self, image_path: str, include_exif_tags: bool = True) -> dict:
         """
         获取图像信息（用于调试）
         
         Args:
             image_path: 图像路径
+            include_exif_tags: 是否列出EXIF标签；只需判断有无EXIF时传False，省去逐项格式化
             
         Returns:
             图像信息字典
         """
         try:
             with Image.open(image_path) as img:
+                # EXIF只解析一次，有无EXIF和标签列表共用
+                exif_data = img.getexif()
                 info = {
                     'format': img.format,
                     'mode': img.mode,
                     'size': img.size,
-                    'has_exif': bool(img.getexif()),
+                    'has_exif': len(exif_data) > 0,
                     'has_transparency': 'transparency' in img.info
                 }
                 
                 # 获取EXIF信息
-                exif_data = img.getexif()
-                if exif_data:
-                    info['exif_tags'] = []
-                    for tag_id, value in exif_data.items():
-                        tag = TAGS.get(tag_id, tag_id)
-                        info['exif_tags'].append(f"{tag}: {value}")
+                if include_exif_tags and exif_data:
+                    info['exif_tags'] = [f"{TAGS.get(tag_id, tag_id)}: {value}"
+                                         for tag_id, value in exif_data.items()]
                         
                 return info
                 